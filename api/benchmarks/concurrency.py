@@ -0,0 +1,92 @@
+"""Requests/sec for one uvicorn-style worker, before and after the worker pool.
+
+Runs the real FastAPI app in-process against the PostgREST stand-in and fires
+concurrent ``GET /profiles/{id}`` and ``GET /responses/`` requests. The
+"blocking" run sets ``DB_MAX_WORKERS=0`` so Supabase calls execute inline on
+the event loop, as they did before the data-access layer existed. The read
+cache and single-flight coalescing are disabled so every request reaches the
+stand-in.
+
+Usage (from the ``api`` directory):
+
+    python -m benchmarks.concurrency --latency 0.02 --requests 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+from benchmarks.standin import FAKE_KEY, SupabaseStandIn
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+async def _drive(app, total: int, concurrency: int):
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(client: httpx.AsyncClient, i: int):
+        path = f"/profiles/{USER_ID}" if i % 2 else f"/responses/?user_id={USER_ID}"
+        async with gate:
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.text
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(one(client, i) for i in range(total)))
+            elapsed = time.perf_counter() - started
+    return elapsed, latencies
+
+
+def run_mode(label: str, workers: int, args) -> float:
+    from config import get_settings
+    from main import app
+
+    os.environ["DB_MAX_WORKERS"] = str(workers)
+    get_settings.cache_clear()
+    elapsed, latencies = asyncio.run(_drive(app, args.requests, args.concurrency))
+    rps = args.requests / elapsed
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{label:<10} workers={workers:<3} {rps:8.1f} req/s  "
+        f"p50={statistics.median(latencies) * 1000:7.1f}ms  p95={p95 * 1000:7.1f}ms"
+    )
+    return rps
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.02, help="stand-in delay per call (s)")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=20, help="DB_MAX_WORKERS for the pooled run")
+    args = parser.parse_args()
+
+    with SupabaseStandIn(latency=args.latency) as standin:
+        standin.seed("profiles", [{
+            "id": USER_ID, "email": "bench@example.com", "username": "bench",
+            "avatar_url": "/images/avatar images/Ninja.jpg", "avatar_id": "Ninja",
+        }])
+        standin.seed("responses", [
+            {"user_id": USER_ID, "pillar": "passion", "question_id": f"q{i}", "response": "..."}
+            for i in range(5)
+        ])
+        os.environ["SUPABASE_URL"] = standin.url
+        os.environ["SUPABASE_KEY"] = FAKE_KEY
+        os.environ["CACHE_BACKEND"] = "none"
+        os.environ["DB_SINGLE_FLIGHT"] = "false"
+
+        before = run_mode("blocking", 0, args)
+        after = run_mode("pooled", args.workers, args)
+    print(f"speed-up: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
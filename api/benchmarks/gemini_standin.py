@@ -0,0 +1,158 @@
+"""In-process stand-in for the Gemini ``generateContent`` REST API.
+
+Point the app at it with ``GEMINI_API_ENDPOINT`` (any ``GEMINI_API_KEY``
+works). It answers the two prompt shapes ``SuggestionService`` sends: the
+single prompt gets a comma-separated list, the batch prompt (a JSON array of
+entries) a JSON object per entry. Suggestions are derived from the words the user wrote, so
+repeated texts get repeated answers. ``latency`` is injected before every
+reply; ``streamGenerateContent`` replies are sent as chunked JSON with
+``chunk_delay`` between chunks, the way the model streams tokens. ``fail``
+makes the next calls return 503s.
+"""
+import json
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from typing import Any, Dict, List, Optional
+
+from benchmarks.standin import _Server
+
+_SINGLE = re.compile(r'They wrote: "(.*)"')
+_BATCH_ENTRIES = re.compile(r"^\s*(\[\{.*\}\])\s*$", re.MULTILINE)
+_WORD = re.compile(r"[A-Za-z]+")
+
+
+def suggestions_for(text: str, limit: int = 3) -> List[str]:
+    words = [w.lower() for w in _WORD.findall(text) if len(w) > 3] or ["purpose"]
+    return [f"{word.title()} focus" for word in (words * limit)[:limit]]
+
+
+def reply_text(prompt: str) -> str:
+    batch = _BATCH_ENTRIES.search(prompt)
+    if batch:
+        entries = json.loads(batch.group(1))
+        return json.dumps({str(e["entry"]): suggestions_for(e["text"]) for e in entries})
+    match = _SINGLE.search(prompt)
+    return ", ".join(suggestions_for(match.group(1) if match else prompt))
+
+
+def candidate(text: str) -> Dict[str, Any]:
+    return {
+        "candidates": [
+            {"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}
+        ]
+    }
+
+
+class GeminiStandIn:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        chunk_delay: float = 0.0,
+        chunk_size: int = 12,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+        self.request_count = 0
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "GeminiStandIn":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "GeminiStandIn":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def fail(self, times: int = 1) -> None:
+        """Make the next ``times`` model calls fail with a 503."""
+        with self._lock:
+            self._failures += times
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            self.request_count += 1
+            if self._failures:
+                self._failures -= 1
+                return True
+        return False
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def _send(self, status: int, payload: Any) -> None:
+                encoded = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def _write_chunk(self, data: bytes) -> None:
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                prompt = "".join(
+                    part.get("text", "")
+                    for content in body.get("contents", [])
+                    for part in content.get("parts", [])
+                )
+                if standin.latency:
+                    time.sleep(standin.latency)
+                if standin._should_fail():
+                    self._send(503, {"error": {"code": 503, "message": "Injected failure", "status": "UNAVAILABLE"}})
+                    return
+
+                text = reply_text(prompt)
+                if ":streamGenerateContent" not in self.path:
+                    self._send(200, candidate(text))
+                    return
+
+                # A JSON array of responses, one per chunk, as the REST API streams it
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                pieces = [text[i:i + standin.chunk_size] for i in range(0, len(text), standin.chunk_size)]
+                for index, piece in enumerate(pieces):
+                    if index and standin.chunk_delay:
+                        time.sleep(standin.chunk_delay)
+                    prefix = "[" if index == 0 else ","
+                    self._write_chunk((prefix + json.dumps(candidate(piece))).encode())
+                self._write_chunk(b"]")
+                self._write_chunk(b"")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,225 @@
+"""Offline load test of the API against in-process Supabase and Gemini stand-ins.
+
+Runs the real FastAPI app (lifespan, auth, cache, worker pool, background
+tasks) with its Supabase traffic going to ``benchmarks.standin`` and its
+Gemini traffic to ``benchmarks.gemini_standin``, both with injected latency,
+and drives the journeys users take through the app:
+
+- ``signup``: ``POST /auth/signup`` for every virtual user
+- ``answers``: each user saves answers for every pillar one question at a
+  time, as the autosaving form does, then checks ``GET /responses/{id}/progress``
+  and reads ``GET /responses/`` back
+- ``chart``: each user saves a chart, then loads it and its workplace tips
+- ``ai``: a burst of ``/ai/suggestions`` and ``/ai/suggestions/stream`` calls
+  from everyone at once, mixing repeated and fresh texts
+
+Phases run in that order (later ones need the signed-up users) and every
+request carries the user's access token, so token verification is included.
+For each endpoint the report gives the request count, errors, throughput
+over its phase and p50/p95/p99 latency. ``--set NAME=VALUE`` overrides any
+setting, which makes it easy to compare configurations, e.g.
+``--set CACHE_BACKEND=none``.
+
+Usage (from the ``api`` directory):
+
+    python -m benchmarks.load --users 50 --concurrency 20 --db-latency 0.02 --gemini-latency 0.3
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.gemini_standin import GeminiStandIn
+from benchmarks.standin import FAKE_KEY, JWT_SECRET, SupabaseStandIn
+
+PILLARS = ("passion", "profession", "mission", "vocation")
+QUESTIONS_PER_PILLAR = 3
+PHASES = ("signup", "answers", "chart", "ai")
+
+# Free-text fragments users type into the suggestion box
+FRAGMENTS = (
+    "I lose track of time when", "people often thank me for", "I would love to fix",
+    "I could be paid for", "my friends ask me about", "I feel proud when",
+)
+TOPICS = (
+    "sketching buildings", "explaining maths", "planting trees", "fixing old bikes",
+    "organising events", "listening to people", "writing code", "cooking for friends",
+    "teaching kids to swim", "editing videos", "running workshops", "caring for animals",
+)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    def __init__(self, client: httpx.AsyncClient, concurrency: int):
+        self.client = client
+        self.gate = asyncio.Semaphore(concurrency)
+        self.samples: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+        self.errors: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.phase = ""
+
+    async def call(self, endpoint: str, method: str, url: str, token: Optional[str] = None, **kwargs) -> httpx.Response:
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        async with self.gate:
+            started = time.perf_counter()
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+            elapsed = time.perf_counter() - started
+        key = (self.phase, f"{method} {endpoint}")
+        self.samples[key].append(elapsed)
+        if response.status_code >= 400:
+            self.errors[key] += 1
+        return response
+
+
+class User:
+    def __init__(self, number: int):
+        self.email = f"user{number}@bench.example"
+        self.username = f"user{number}"
+        self.id: Optional[str] = None
+        self.token: Optional[str] = None
+        self.answers: Dict[str, List[str]] = {}
+
+
+async def sign_up(recorder: Recorder, user: User) -> None:
+    response = await recorder.call("/auth/signup", "POST", "/auth/signup", json={
+        "email": user.email, "password": "benchmark-password",
+        "username": user.username, "avatar_id": "Ninja",
+    })
+    if response.status_code == 200:
+        body = response.json()
+        user.id, user.token = body["user_id"], body["access_token"]
+
+
+async def save_answers(recorder: Recorder, user: User, corpus: Dict[str, List[str]], rng: random.Random) -> None:
+    for pillar in PILLARS:
+        for question in range(1, QUESTIONS_PER_PILLAR + 1):
+            answer = "|".join(rng.sample(corpus[pillar], 2))
+            user.answers.setdefault(pillar, []).extend(answer.split("|"))
+            await recorder.call("/responses/", "POST", "/responses/", user.token, json={
+                "user_id": user.id, "pillar": pillar,
+                "question_id": f"{pillar}-{question}", "response": answer,
+            })
+    await recorder.call("/responses/{user_id}/progress", "GET", f"/responses/{user.id}/progress", user.token)
+    await recorder.call("/responses/", "GET", "/responses/", user.token, params={"user_id": user.id})
+
+
+async def save_chart(recorder: Recorder, user: User) -> None:
+    chart_data = {pillar: user.answers.get(pillar, []) for pillar in PILLARS}
+    await recorder.call("/charts/", "POST", "/charts/", user.token, json={
+        "user_id": user.id, "chart_data": chart_data,
+    })
+    await recorder.call("/charts/{user_id}", "GET", f"/charts/{user.id}", user.token)
+    await recorder.call("/charts/{user_id}/tips", "GET", f"/charts/{user.id}/tips", user.token)
+
+
+async def ask_for_suggestions(recorder: Recorder, user: User, number: int, rng: random.Random, repeat: float) -> None:
+    pillar = rng.choice(PILLARS)
+    if rng.random() < repeat:
+        text = f"{FRAGMENTS[0]} {TOPICS[number % 3]}"  # popular texts, served from cache
+    else:
+        text = f"{rng.choice(FRAGMENTS)} {rng.choice(TOPICS)} on {rng.choice(TOPICS)} #{number}"
+    stream = number % 4 == 0
+    path = "/ai/suggestions/stream" if stream else "/ai/suggestions"
+    await recorder.call(path, "POST", path, user.token, json={"pillar": pillar, "text": text})
+
+
+async def run_phase(recorder: Recorder, name: str, coroutines) -> float:
+    recorder.phase = name
+    started = time.perf_counter()
+    await asyncio.gather(*coroutines)
+    return time.perf_counter() - started
+
+
+async def drive(app, args) -> Tuple[Recorder, Dict[str, float]]:
+    from services.suggestion_ranker import CORPUS
+
+    rng = random.Random(args.seed)
+    users = [User(number) for number in range(args.users)]
+    wall: Dict[str, float] = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(app=app, base_url="http://bench", timeout=60.0) as client:
+            recorder = Recorder(client, args.concurrency)
+            wall["signup"] = await run_phase(recorder, "signup", [sign_up(recorder, u) for u in users])
+            users = [u for u in users if u.token]
+            if "answers" in args.phases:
+                wall["answers"] = await run_phase(
+                    recorder, "answers", [save_answers(recorder, u, CORPUS, rng) for u in users]
+                )
+            if "chart" in args.phases:
+                wall["chart"] = await run_phase(recorder, "chart", [save_chart(recorder, u) for u in users])
+            if "ai" in args.phases and users:
+                recorder.gate = asyncio.Semaphore(args.ai_requests)  # everyone at once
+                wall["ai"] = await run_phase(recorder, "ai", [
+                    ask_for_suggestions(recorder, users[i % len(users)], i, rng, args.ai_repeat)
+                    for i in range(args.ai_requests)
+                ])
+    return recorder, wall
+
+
+def report(recorder: Recorder, wall: Dict[str, float]) -> None:
+    print(f"{'phase':<8} {'endpoint':<36} {'count':>6} {'errors':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for phase in PHASES:
+        keys = [key for key in recorder.samples if key[0] == phase]
+        if not keys:
+            continue
+        for key in sorted(keys):
+            latencies = sorted(recorder.samples[key])
+            ms = [percentile(latencies, f) * 1000 for f in (0.50, 0.95, 0.99)]
+            print(
+                f"{phase:<8} {key[1]:<36} {len(latencies):>6} {recorder.errors[key]:>6} "
+                f"{len(latencies) / wall[phase]:>8.1f} {ms[0]:>6.1f}ms {ms[1]:>6.1f}ms {ms[2]:>6.1f}ms"
+            )
+        total = sum(len(recorder.samples[key]) for key in keys)
+        print(f"{phase:<8} {'(all)':<36} {total:>6} {'':>6} {total / wall[phase]:>8.1f}  in {wall[phase]:.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=20, help="requests in flight during the user phases")
+    parser.add_argument("--phases", default=",".join(PHASES), help="comma-separated subset of " + ", ".join(PHASES))
+    parser.add_argument("--db-latency", type=float, default=0.02, help="stand-in delay per Supabase call (s)")
+    parser.add_argument("--gemini-latency", type=float, default=0.3, help="stand-in delay per model call (s)")
+    parser.add_argument("--gemini-chunk-delay", type=float, default=0.02, help="delay between streamed chunks (s)")
+    parser.add_argument("--ai-requests", type=int, default=None, help="size of the suggestion burst (default 2 per user)")
+    parser.add_argument("--ai-repeat", type=float, default=0.3, help="share of the burst asking for popular texts")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", help="override a setting")
+    args = parser.parse_args()
+    args.phases = {phase.strip() for phase in args.phases.split(",") if phase.strip()}
+    if args.ai_requests is None:
+        args.ai_requests = 2 * args.users
+
+    with SupabaseStandIn(latency=args.db_latency) as supabase, GeminiStandIn(
+        latency=args.gemini_latency, chunk_delay=args.gemini_chunk_delay
+    ) as gemini:
+        os.environ.update(
+            SUPABASE_URL=supabase.url,
+            SUPABASE_KEY=FAKE_KEY,
+            SUPABASE_JWT_SECRET=JWT_SECRET,
+            AUTH_REQUIRED="true",
+            GEMINI_API_KEY="standin",
+            GEMINI_API_ENDPOINT=gemini.url,
+        )
+        for override in args.set:
+            name, _, value = override.partition("=")
+            os.environ[name.upper()] = value
+
+        from main import app
+
+        recorder, wall = asyncio.run(drive(app, args))
+        report(recorder, wall)
+        print(f"upstream calls: supabase {supabase.request_count}, gemini {gemini.request_count}")
+
+
+if __name__ == "__main__":
+    main()
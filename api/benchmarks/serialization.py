@@ -0,0 +1,113 @@
+"""Per-request serialisation cost of the read endpoints.
+
+Times how long FastAPI spends turning rows into a response body for
+``GET /responses/`` (a list of response rows) and ``GET /charts/{user_id}``
+(one row with a large nested ``chart_data``), using the routes' real
+response fields:
+
+- ``pydantic+json``: response-model validation, then the stdlib ``json``
+  renderer (the app's behaviour before orjson)
+- ``pydantic+orjson``: the same validation, rendered by ``ORJSONResponse``
+  (the default response class now)
+- ``trusted+orjson``: the ``TRUST_DATABASE_ROWS`` fast path, rows rendered
+  directly with no validation
+
+Usage (from the ``api`` directory):
+
+    python -m benchmarks.serialization --rows 500 --chart-items 2000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import APIRoute, serialize_response
+
+from main import app
+
+
+def response_rows(count: int):
+    now = datetime.now(timezone.utc).isoformat()
+    user_id = str(uuid.uuid4())
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "pillar": ("passion", "profession", "mission", "vocation")[i % 4],
+            "question_id": f"question-{i}",
+            "response": "Drawing or painting|Teaching others|Long walks in the hills",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def chart_row(items: int):
+    sections = ("passion", "profession", "mission", "vocation", "love", "good", "paid", "needs", "ikigai")
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": str(uuid.uuid4()),
+        "chart_data": {
+            section: [f"{section} item {i}" for i in range(items // len(sections))]
+            for section in sections
+        },
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def response_field(path: str):
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path == path and "GET" in route.methods:
+            return route.response_field
+    raise LookupError(path)
+
+
+async def validated(field, payload, response_class):
+    content = await serialize_response(field=field, response_content=payload)
+    return response_class(content).body
+
+
+async def trusted(field, payload, response_class):
+    return response_class(payload).body
+
+
+async def measure(fn, field, payload, response_class, repeat: int) -> float:
+    await fn(field, payload, response_class)  # warm-up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await fn(field, payload, response_class)
+    return (time.perf_counter() - started) / repeat
+
+
+async def run(args) -> None:
+    cases = [
+        (f"GET /responses/ ({args.rows} rows)", response_field("/responses/"), response_rows(args.rows)),
+        (f"GET /charts/{{id}} ({args.chart_items} items)", response_field("/charts/{user_id}"), chart_row(args.chart_items)),
+    ]
+    modes = [
+        ("pydantic+json", validated, JSONResponse),
+        ("pydantic+orjson", validated, ORJSONResponse),
+        ("trusted+orjson", trusted, ORJSONResponse),
+    ]
+    for label, field, payload in cases:
+        print(label)
+        baseline = None
+        for mode, fn, response_class in modes:
+            seconds = await measure(fn, field, payload, response_class, args.repeat)
+            baseline = baseline or seconds
+            print(f"  {mode:<16} {seconds * 1000:8.3f} ms/request  {baseline / seconds:5.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500, help="response rows in the list payload")
+    parser.add_argument("--chart-items", type=int, default=2000, help="strings across all chart sections")
+    parser.add_argument("--repeat", type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
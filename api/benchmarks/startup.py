@@ -0,0 +1,127 @@
+"""Cold-start profile of the serverless entry point.
+
+Each mode runs in a fresh interpreter with ``python -X importtime``, imports
+``serverless`` (the Vercel/Mangum handler) and serves ``--invocations``
+requests through the handler: the first one after a cold start, then warm
+ones on the same instance. It reports the time to import, the time to answer
+the first request, the median warm invocation (services started once must
+survive across invocations, so it should be far below the first), and the
+modules with the largest cumulative import time:
+
+- ``eager``: ``LAZY_STARTUP=false``, the Supabase client and Gemini model are
+  built when the app starts (the ``uvicorn main:app`` behaviour)
+- ``lazy``: ``LAZY_STARTUP=true``, what ``serverless.py`` now runs with
+
+``/health`` touches neither Supabase nor Gemini. Other paths need real
+``SUPABASE_*``/``GEMINI_API_KEY`` values in the environment.
+
+Usage (from the ``api`` directory):
+
+    python -m benchmarks.startup --path /health --invocations 5 --top 15
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import serverless
+imported = time.perf_counter()
+event = json.loads(sys.argv[1])
+response = serverless.handler(event, {})
+answered = time.perf_counter()
+warm = []
+for _ in range(int(sys.argv[2]) - 1):
+    before = time.perf_counter()
+    serverless.handler(event, {})
+    warm.append(time.perf_counter() - before)
+print(json.dumps({
+    "import": imported - started,
+    "first_request": answered - imported,
+    "warm": sorted(warm)[len(warm) // 2] if warm else None,
+    "status": response["statusCode"],
+}))
+"""
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def gateway_event(method: str, path: str) -> Dict:
+    """Minimal API Gateway (REST) event, the shape Mangum expects."""
+    return {
+        "resource": "/{proxy+}",
+        "path": path,
+        "httpMethod": method,
+        "headers": {"host": "localhost"},
+        "multiValueHeaders": {},
+        "queryStringParameters": None,
+        "multiValueQueryStringParameters": None,
+        "requestContext": {"resourcePath": "/{proxy+}", "httpMethod": method, "stage": "profile"},
+        "body": None,
+        "isBase64Encoded": False,
+    }
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, float, float]]:
+    """(module, nesting depth, self seconds, cumulative seconds) per import."""
+    modules = []
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append((name, len(indent) // 2, int(own) / 1e6, int(cumulative) / 1e6))
+    return modules
+
+
+def profile(mode: str, method: str, path: str, invocations: int):
+    env = dict(os.environ, LAZY_STARTUP="true" if mode == "lazy" else "false")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD, json.dumps(gateway_event(method, path)), str(invocations)],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"{mode} run failed:\n{result.stderr[-2000:]}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, parse_importtime(result.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--path", default="/health", help="request served by the first invocation")
+    parser.add_argument("--mode", choices=("eager", "lazy", "both"), default="both")
+    parser.add_argument("--invocations", type=int, default=5, help="requests per instance, the first one cold")
+    parser.add_argument("--top", type=int, default=15, help="modules to list per mode")
+    parser.add_argument("--depth", type=int, default=None, help="only list imports nested this deep or less")
+    args = parser.parse_args()
+
+    modes = ("eager", "lazy") if args.mode == "both" else (args.mode,)
+    totals = {}
+    for mode in modes:
+        timings, modules = profile(mode, args.method, args.path, max(1, args.invocations))
+        totals[mode] = timings["import"] + timings["first_request"]
+        warm = f", warm {timings['warm'] * 1000:.1f} ms" if timings["warm"] is not None else ""
+        print(
+            f"{mode}: import {timings['import'] * 1000:.0f} ms, "
+            f"first {args.method} {args.path} {timings['first_request'] * 1000:.0f} ms{warm} "
+            f"(status {timings['status']}), {len(modules)} modules imported"
+        )
+        if args.depth is not None:
+            modules = [m for m in modules if m[1] <= args.depth]
+        print(f"  {'cumulative':>10} {'self':>8}  module")
+        for name, depth, own, cumulative in sorted(modules, key=lambda m: -m[3])[:args.top]:
+            print(f"  {cumulative * 1000:8.1f}ms {own * 1000:6.1f}ms  {'  ' * depth}{name}")
+    if len(totals) == 2:
+        print(f"cold start: eager {totals['eager'] * 1000:.0f} ms, lazy {totals['lazy'] * 1000:.0f} ms, "
+              f"{totals['eager'] / totals['lazy']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
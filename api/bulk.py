@@ -0,0 +1,91 @@
+"""Command-line bulk export and import of profiles, charts and responses.
+
+Talks to Supabase directly with the same settings as the API (``SUPABASE_URL``
+and a service-role ``SUPABASE_KEY`` from the environment or ``.env``), so no
+server has to be running. The format is the one ``GET /admin/export`` streams
+and ``POST /admin/import`` accepts; see ``services.bulk_transfer``.
+
+Usage (from the ``api`` directory):
+
+    python -m bulk export --output backup.ndjson
+    python -m bulk export --tables charts,responses > cohort.ndjson
+    python -m bulk import backup.ndjson --chunk-size 500
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import AsyncIterator, BinaryIO
+
+from dotenv import load_dotenv
+
+from config import get_settings
+from services.bulk_transfer import DEFAULT_CHUNK_SIZE, export_ndjson, import_ndjson, parse_tables
+from services.cache import create_cache
+from services.database import Database
+from services.pagination import MAX_PAGE_SIZE
+from services.supabase_client import SupabaseProvider
+
+READ_SIZE = 1024 * 1024
+
+
+def open_database() -> Database:
+    settings = get_settings()
+    # No caching: every row is read or written exactly once
+    db = Database(SupabaseProvider(settings), settings, create_cache("none", ttl=0, max_entries=0))
+    db.start()
+    return db
+
+
+async def read_chunks(source: BinaryIO) -> AsyncIterator[bytes]:
+    while True:
+        chunk = source.read(READ_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def run_export(args) -> None:
+    db = open_database()
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        async for lines in export_ndjson(db, parse_tables(args.tables), args.page_size):
+            output.write(lines)
+    finally:
+        if args.output:
+            output.close()
+        await db.close()
+
+
+async def run_import(args) -> None:
+    db = open_database()
+    source = open(args.file, "rb") if args.file != "-" else sys.stdin.buffer
+    try:
+        result = await import_ndjson(db, read_chunks(source), args.chunk_size)
+    finally:
+        if args.file != "-":
+            source.close()
+        await db.close()
+    print(json.dumps(result), file=sys.stderr)
+
+
+def main() -> None:
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="write tables as NDJSON")
+    export.add_argument("--tables", help="comma-separated subset of profiles, charts, responses")
+    export.add_argument("--output", help="file to write (default: stdout)")
+    export.add_argument("--page-size", type=int, default=MAX_PAGE_SIZE)
+
+    load = commands.add_parser("import", help="upsert rows from an NDJSON export")
+    load.add_argument("file", help="file to read, or - for stdin")
+    load.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    args = parser.parse_args()
+    asyncio.run(run_export(args) if args.command == "export" else run_import(args))
+
+
+if __name__ == "__main__":
+    main()
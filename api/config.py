@@ -0,0 +1,105 @@
+from functools import lru_cache
+from typing import Optional
+
+from pydantic import BaseSettings
+
+
+class Settings(BaseSettings):
+    """Runtime configuration, read from environment variables (case-insensitive)."""
+
+    # Supabase
+    supabase_url: Optional[str] = None
+    supabase_key: Optional[str] = None
+
+    # Access token verification
+    supabase_jwt_secret: Optional[str] = None  # HS256 projects
+    supabase_jwks_url: Optional[str] = None  # defaults to <SUPABASE_URL>/auth/v1/.well-known/jwks.json
+    jwt_audience: str = "authenticated"
+    jwks_cache_ttl: float = 600.0
+    auth_required: bool = False
+    admin_api_key: Optional[str] = None  # X-Admin-Key for /admin (bulk export/import); unset disables it
+
+    # Build the Supabase client and the Gemini model on first use rather than
+    # at startup (serverless.py turns this on to keep cold starts short)
+    lazy_startup: bool = False
+
+    # Supabase connection pool
+    supabase_pool_size: int = 20
+    supabase_pool_keepalive: int = 10
+    supabase_keepalive_expiry: float = 30.0
+    supabase_timeout: float = 10.0
+    supabase_connect_timeout: float = 5.0
+    supabase_http2: bool = True
+
+    # Worker pool that runs the blocking Supabase calls (0 = run inline)
+    db_max_workers: int = 20
+    db_max_queue: int = 200
+    db_queue_timeout: float = 5.0
+    db_single_flight: bool = True  # coalesce identical concurrent reads
+
+    # Resilience for Supabase calls (services/resilience.py)
+    db_deadline: float = 8.0  # seconds per attempt, including the wait for a worker; 0 disables
+    db_read_retries: int = 2  # extra attempts for reads after an upstream failure
+    db_retry_backoff: float = 0.1  # base of the jittered exponential backoff
+    db_hedge_after: float = 0.0  # send a second read after this many seconds; 0 disables
+    db_breaker_failures: int = 5  # consecutive failures that open the circuit; 0 disables
+    db_breaker_reset: float = 30.0  # seconds before a trial call is let through
+
+    # Read-through cache for profiles, charts and responses
+    cache_backend: str = "memory"  # "memory", "redis" or "none"
+    cache_ttl: float = 60.0
+    cache_max_entries: int = 10000
+    cache_redis_url: Optional[str] = None
+    cache_stale_ttl: float = 600.0  # serve expired reads this long while Supabase is down; 0 disables
+
+    # Gemini suggestions
+    gemini_api_key: Optional[str] = None
+    gemini_model: str = "gemini-pro"
+    gemini_api_endpoint: Optional[str] = None  # REST endpoint override, e.g. a proxy or benchmarks/gemini_standin.py
+    suggestion_timeout: float = 8.0
+    suggestion_max_concurrency: int = 4
+    suggestion_max_queue: int = 32
+    suggestion_cache_size: int = 1024
+    suggestion_cache_ttl: float = 3600.0
+    suggestion_batch_window: float = 0.02  # seconds to collect a batch
+    suggestion_max_batch_size: int = 8  # 1 disables batching
+    suggestion_local_fallback: bool = True  # answer from the local ranker when Gemini fails
+    suggestion_local_first_score: float = 0.8  # skip Gemini for local matches this close; 0 disables
+    suggestion_retries: int = 0  # extra model attempts after an upstream failure
+    suggestion_breaker_failures: int = 5  # consecutive model failures that open the circuit; 0 disables
+    suggestion_breaker_reset: float = 30.0
+
+    # Server-side chart materialisation from responses. Needs the
+    # merge_chart_sections function from supabase/chart_materialization.sql
+    chart_materialize: bool = False
+    chart_materialize_delay: float = 0.5  # seconds to coalesce autosaves per rebuild
+
+    # Send rows read from Supabase without re-validating them through the
+    # response models (profile, chart and response reads)
+    trust_database_rows: bool = False
+
+    # Prometheus metrics at GET /metrics; Server-Timing adds per-request
+    # upstream timings to every response
+    metrics_enabled: bool = True
+    server_timing: bool = False
+
+    # Workplace tips, memoised per chart content
+    tips_cache_size: int = 1024
+
+    # Background profile creation for sign-ups
+    signup_workers: int = 2
+    signup_queue_size: int = 1000
+    signup_max_attempts: int = 5
+    signup_retry_backoff: float = 0.5
+    signup_reconcile_interval: float = 600.0  # 0 disables the reconciler
+
+    # Write-behind buffering of POST /responses/ autosaves
+    responses_write_behind: bool = False
+    write_behind_max_entries: int = 500
+    write_behind_flush_interval: float = 1.0
+    write_behind_max_pending: int = 5000  # beyond this, saves are written directly
+
+
+@lru_cache()
+def get_settings() -> Settings:
+    return Settings()
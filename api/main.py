@@ -1,36 +1,99 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
-import os
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from dotenv import load_dotenv
-import google.generativeai as genai
-from supabase import create_client, Client
 
-from routers import auth, profiles, responses, charts
+from config import get_settings
+from routers import admin, ai, auth, profiles, responses, charts
+from services.auth_tokens import TokenVerifier
+from services.cache import create_cache
+from services.chart_materializer import ChartMaterializer
+from services.database import Database
+from services.metrics import Metrics, MetricsMiddleware
+from services.signup_pipeline import SignupPipeline
+from services.suggestions import SuggestionService
+from services.supabase_client import SupabaseProvider
+from services.workplace_tips import TipsEngine
+from services.write_buffer import ResponseWriteBuffer
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Supabase client
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_KEY")
-
-if not supabase_url or not supabase_key:
-    raise ValueError("Missing Supabase environment variables")
+# Shared clients live for the lifetime of the app. Under uvicorn the lifespan
+# starts and stops them; serverless.py starts them on the first request and
+# keeps them for every warm invocation after it.
+async def start_services(app: FastAPI) -> None:
+    settings = get_settings()
+    cache = create_cache(
+        settings.cache_backend,
+        ttl=settings.cache_ttl,
+        max_entries=settings.cache_max_entries,
+        redis_url=settings.cache_redis_url,
+        stale_ttl=settings.cache_stale_ttl
+    )
+    app.state.metrics = Metrics() if settings.metrics_enabled else None
+    db = Database(SupabaseProvider(settings), settings, cache, metrics=app.state.metrics)
+    db.start()
+    app.state.db = db
+    app.state.token_verifier = TokenVerifier(settings)
+    app.state.auth_required = settings.auth_required
+    app.state.admin_api_key = settings.admin_api_key
+    app.state.trust_database_rows = settings.trust_database_rows
+    app.state.signup_pipeline = SignupPipeline(
+        db,
+        workers=settings.signup_workers,
+        max_queue=settings.signup_queue_size,
+        max_attempts=settings.signup_max_attempts,
+        retry_backoff=settings.signup_retry_backoff,
+        reconcile_interval=settings.signup_reconcile_interval
+    )
+    app.state.signup_pipeline.start()
+    if settings.responses_write_behind:
+        app.state.response_buffer = ResponseWriteBuffer(
+            db,
+            max_entries=settings.write_behind_max_entries,
+            flush_interval=settings.write_behind_flush_interval,
+            max_pending=settings.write_behind_max_pending
+        )
+        app.state.response_buffer.start()
+    if settings.chart_materialize:
+        app.state.chart_materializer = ChartMaterializer(
+            db,
+            buffer=getattr(app.state, "response_buffer", None),
+            delay=settings.chart_materialize_delay
+        )
+        app.state.chart_materializer.start()
+    # Without GEMINI_API_KEY the service answers from its local ranker only
+    app.state.suggestions = SuggestionService(settings, metrics=app.state.metrics)
+    app.state.suggestions.start()
+    app.state.tips_engine = TipsEngine(settings.tips_cache_size)
 
-supabase: Client = create_client(supabase_url, supabase_key)
+async def stop_services(app: FastAPI) -> None:
+    settings = get_settings()
+    app.state.suggestions.close()
+    await app.state.signup_pipeline.stop()
+    if settings.chart_materialize:
+        await app.state.chart_materializer.stop()
+    if settings.responses_write_behind:
+        await app.state.response_buffer.stop()
+    await app.state.db.close()
 
-# Initialize Google Gemini API
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-if gemini_api_key:
-    genai.configure(api_key=gemini_api_key)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_services(app)
+    try:
+        yield
+    finally:
+        await stop_services(app)
 
 # Create FastAPI app
 app = FastAPI(
     title="Ikigai Pathway API",
     description="Backend API for the Ikigai Pathway application",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -40,13 +103,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "Server-Timing"],
 )
 
+# Outermost, so the recorded latency covers everything below it
+app.add_middleware(MetricsMiddleware, server_timing=get_settings().server_timing)
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(profiles.router, prefix="/profiles", tags=["User Profiles"])
 app.include_router(responses.router, prefix="/responses", tags=["User Responses"])
 app.include_router(charts.router, prefix="/charts", tags=["Ikigai Charts"])
+app.include_router(ai.router, prefix="/ai", tags=["AI Suggestions"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 
 @app.get("/")
 async def root():
@@ -54,44 +123,21 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "cache": app.state.db.cache.stats(),
+        "coalesced_reads": app.state.db.coalesced,
+        "upstreams": {
+            "supabase": app.state.db.upstream.stats(),
+            "gemini": app.state.suggestions.upstream.stats()
+        }
+    }
 
-# AI suggestion endpoint
-class SuggestionRequest(BaseModel):
-    text: str
-    pillar: str
-
-class SuggestionResponse(BaseModel):
-    suggestions: List[str]
-
-@app.post("/ai/suggestions", response_model=SuggestionResponse)
-async def get_suggestions(request: SuggestionRequest):
-    if not gemini_api_key:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="AI service is not configured"
-        )
-    
-    try:
-        model = genai.GenerativeModel('gemini-pro')
-        prompt = f"""
-        The user is filling out a section about their ikigai (life purpose) related to the pillar: {request.pillar}.
-        They wrote: "{request.text}"
-        
-        Based on what they wrote, suggest 3 clarifying words or phrases that might help them articulate their thoughts better.
-        Each suggestion should be concise (1-3 words) and directly related to what they wrote.
-        Return only the suggestions as a comma-separated list, nothing else.
-        """
-        
-        response = model.generate_content(prompt)
-        suggestions = [s.strip() for s in response.text.split(',')]
-        return SuggestionResponse(suggestions=suggestions[:3])  # Limit to 3 suggestions
-    
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error generating suggestions: {str(e)}"
-        )
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if app.state.metrics is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Metrics are disabled")
+    return PlainTextResponse(app.state.metrics.render(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     import uvicorn
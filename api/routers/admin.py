@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+from services.auth_tokens import require_admin
+from services.bulk_transfer import DEFAULT_CHUNK_SIZE, export_ndjson, import_ndjson, parse_tables
+from services.database import Database, get_db
+from services.pagination import MAX_PAGE_SIZE
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+# Bulk transfer models
+class ImportResult(BaseModel):
+    lines: int
+    imported: Dict[str, int]
+
+# Streams every row of the chosen tables as NDJSON, one keyset page at a time
+@router.get("/export")
+async def export_data(
+    tables: Optional[str] = None,
+    page_size: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Database = Depends(get_db)
+):
+    names = parse_tables(tables)
+    
+    return StreamingResponse(
+        export_ndjson(db, names, page_size),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="ikigai-export.ndjson"'}
+    )
+
+# Reads an export (or any file in its format) from the request body as it
+# arrives and upserts it in chunks
+@router.post("/import", response_model=ImportResult)
+async def import_data(
+    request: Request,
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=5000),
+    db: Database = Depends(get_db)
+):
+    try:
+        return await import_ndjson(db, request.stream(), chunk_size)
+    
+    except HTTPException:
+        raise
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Import failed: {str(e)}"
+        )
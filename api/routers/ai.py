@@ -0,0 +1,98 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import AsyncIterator, List
+import json
+
+from services.suggestions import (
+    SuggestionService,
+    SuggestionServiceBusy,
+    SuggestionTimeout,
+    get_suggestion_service,
+)
+
+router = APIRouter()
+
+# AI suggestion models
+class SuggestionRequest(BaseModel):
+    text: str
+    pillar: str
+
+class SuggestionResponse(BaseModel):
+    suggestions: List[str]
+
+@router.post("/suggestions", response_model=SuggestionResponse)
+async def get_suggestions(
+    request: SuggestionRequest,
+    service: SuggestionService = Depends(get_suggestion_service)
+):
+    try:
+        suggestions = await service.suggest(request.pillar, request.text)
+        return SuggestionResponse(suggestions=suggestions)
+    
+    except SuggestionServiceBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI service is busy, please retry"
+        )
+    
+    except SuggestionTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="AI suggestions timed out"
+        )
+    
+    except HTTPException:
+        raise
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error generating suggestions: {str(e)}"
+        )
+
+# Server-Sent Events: one "suggestion" event per suggestion, then "done".
+# When the client disconnects the response stops iterating and closes the
+# generator, which tells the model stream to stop.
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def suggestion_events(suggestions: AsyncIterator[str]) -> AsyncIterator[str]:
+    collected = []
+    try:
+        async for suggestion in suggestions:
+            collected.append(suggestion)
+            yield sse_event("suggestion", {"suggestion": suggestion})
+        yield sse_event("done", {"suggestions": collected})
+    
+    except SuggestionServiceBusy:
+        yield sse_event("error", {"detail": "AI service is busy, please retry"})
+    
+    except SuggestionTimeout:
+        yield sse_event("error", {"detail": "AI suggestions timed out"})
+    
+    except HTTPException as e:
+        yield sse_event("error", {"detail": e.detail})
+    
+    except Exception as e:
+        yield sse_event("error", {"detail": f"Error generating suggestions: {str(e)}"})
+
+@router.post("/suggestions/stream")
+async def stream_suggestions(
+    request: SuggestionRequest,
+    service: SuggestionService = Depends(get_suggestion_service)
+):
+    try:
+        suggestions = service.stream(request.pillar, request.text)
+    
+    except SuggestionServiceBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI service is busy, please retry"
+        )
+    
+    return StreamingResponse(
+        suggestion_events(suggestions),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,23 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from typing import Optional
-import os
-from supabase import Client, create_client
 
-router = APIRouter()
+from services.database import Database, get_db
+from services.signup_pipeline import ProfileJob, SignupPipeline, get_signup_pipeline
 
-# Get Supabase client
-def get_supabase() -> Client:
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_KEY")
-    
-    if not supabase_url or not supabase_key:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Supabase configuration missing"
-        )
-    
-    return create_client(supabase_url, supabase_key)
+router = APIRouter()
 
 # Auth models
 class SignUpRequest(BaseModel):
@@ -36,12 +24,20 @@ class AuthResponse(BaseModel):
     user_id: str
 
 @router.post("/signup", response_model=AuthResponse)
-async def sign_up(request: SignUpRequest, supabase: Client = Depends(get_supabase)):
+async def sign_up(
+    request: SignUpRequest,
+    db: Database = Depends(get_db),
+    pipeline: SignupPipeline = Depends(get_signup_pipeline)
+):
     try:
-        # Sign up user with Supabase Auth
-        auth_response = supabase.auth.sign_up({
+        # Sign up user with Supabase Auth. The profile fields are kept in the
+        # user metadata so the reconciler can rebuild a missing profile.
+        auth_response = await db.run(db.auth().sign_up, {
             "email": request.email,
             "password": request.password,
+            "options": {
+                "data": {"username": request.username, "avatar_id": request.avatar_id}
+            },
         })
         
         if not auth_response.user:
@@ -52,27 +48,13 @@ async def sign_up(request: SignUpRequest, supabase: Client = Depends(get_supabas
         
         user_id = auth_response.user.id
         
-        # Create profile in the profiles table
-        avatar_filename = request.avatar_id
-        avatar_url = f"/images/avatar images/{avatar_filename}.jpg"
-        
-        profile_data = {
-            "id": user_id,
-            "email": request.email,
-            "username": request.username,
-            "avatar_url": avatar_url,
-            "avatar_id": request.avatar_id
-        }
-        
-        profile_response = supabase.table("profiles").insert(profile_data).execute()
-        
-        if hasattr(profile_response, 'error') and profile_response.error:
-            # If profile creation fails, we should delete the auth user
-            supabase.auth.admin.delete_user(user_id)
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to create profile: {profile_response.error.message}"
-            )
+        # Create the profile in the background; the tokens don't depend on it
+        await pipeline.submit(ProfileJob(
+            user_id=user_id,
+            email=request.email,
+            username=request.username,
+            avatar_id=request.avatar_id
+        ))
         
         return AuthResponse(
             access_token=auth_response.session.access_token,
@@ -80,6 +62,9 @@ async def sign_up(request: SignUpRequest, supabase: Client = Depends(get_supabas
             user_id=user_id
         )
     
+    except HTTPException:
+        raise
+    
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -87,9 +72,9 @@ async def sign_up(request: SignUpRequest, supabase: Client = Depends(get_supabas
         )
 
 @router.post("/signin", response_model=AuthResponse)
-async def sign_in(request: SignInRequest, supabase: Client = Depends(get_supabase)):
+async def sign_in(request: SignInRequest, db: Database = Depends(get_db)):
     try:
-        auth_response = supabase.auth.sign_in_with_password({
+        auth_response = await db.run(db.auth().sign_in_with_password, {
             "email": request.email,
             "password": request.password,
         })
@@ -106,6 +91,9 @@ async def sign_in(request: SignInRequest, supabase: Client = Depends(get_supabas
             user_id=auth_response.user.id
         )
     
+    except HTTPException:
+        raise
+    
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -113,10 +101,13 @@ async def sign_in(request: SignInRequest, supabase: Client = Depends(get_supabas
         )
 
 @router.post("/signout")
-async def sign_out(supabase: Client = Depends(get_supabase)):
+async def sign_out(db: Database = Depends(get_db)):
     try:
-        supabase.auth.sign_out()
+        await db.run(db.auth().sign_out)
         return {"message": "Successfully signed out"}
+    except HTTPException:
+        raise
+    
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
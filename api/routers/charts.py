@@ -1,23 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from pydantic import BaseModel
 from typing import Dict, List, Optional, Any
-import os
-from supabase import Client, create_client
 
-router = APIRouter()
+from services.auth_tokens import AuthenticatedUser, ensure_same_user, get_current_user
+from services.chart_materializer import ChartMaterializer, get_chart_materializer
+from services.database import Database, get_db
+from services.etags import conditional
+from services.projection import parse_fields, project
+from services.workplace_tips import TipsEngine, get_tips_engine
 
-# Get Supabase client
-def get_supabase() -> Client:
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_KEY")
-    
-    if not supabase_url or not supabase_key:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Supabase configuration missing"
-        )
-    
-    return create_client(supabase_url, supabase_key)
+router = APIRouter()
 
 # Chart models
 class ChartCreate(BaseModel):
@@ -35,20 +27,20 @@ class WorkplaceTip(BaseModel):
     category: str
 
 @router.post("/", response_model=ChartResponse)
-async def create_chart(request: ChartCreate, supabase: Client = Depends(get_supabase)):
+async def create_chart(
+    request: ChartCreate,
+    db: Database = Depends(get_db),
+    user: Optional[AuthenticatedUser] = Depends(get_current_user)
+):
+    ensure_same_user(user, request.user_id)
+    
     try:
-        # Check if chart already exists for user
-        existing = supabase.table("charts").select("*").eq("user_id", request.user_id).execute()
-        
-        if existing.data and len(existing.data) > 0:
-            # Update existing chart
-            response = supabase.table("charts").update({"chart_data": request.chart_data}).eq("id", existing.data[0]["id"]).execute()
-        else:
-            # Create new chart
-            response = supabase.table("charts").insert({
-                "user_id": request.user_id,
-                "chart_data": request.chart_data
-            }).execute()
+        # Insert or update in one atomic statement, keyed on UNIQUE(user_id)
+        response = await db.execute(db.table("charts").upsert({
+            "user_id": request.user_id,
+            "chart_data": request.chart_data
+        }, on_conflict="user_id"))
+        await db.invalidate(f"charts:{request.user_id}")
         
         if not response.data or len(response.data) == 0:
             raise HTTPException(
@@ -58,6 +50,9 @@ async def create_chart(request: ChartCreate, supabase: Client = Depends(get_supa
         
         return response.data[0]
     
+    except HTTPException:
+        raise
+    
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -65,17 +60,34 @@ async def create_chart(request: ChartCreate, supabase: Client = Depends(get_supa
         )
 
 @router.get("/{user_id}", response_model=ChartResponse)
-async def get_chart(user_id: str, supabase: Client = Depends(get_supabase)):
+async def get_chart(
+    user_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    db: Database = Depends(get_db),
+    materializer: Optional[ChartMaterializer] = Depends(get_chart_materializer),
+    user: Optional[AuthenticatedUser] = Depends(get_current_user)
+):
+    ensure_same_user(user, user_id)
+    columns, wanted = parse_fields(fields, ChartResponse)
+    
+    if materializer is not None:
+        await materializer.settle(user_id)
+    
     try:
-        response = supabase.table("charts").select("*").eq("user_id", user_id).execute()
+        rows = await db.fetch(db.table("charts").select(columns).eq("user_id", user_id), cache=f"charts:{user_id}")
         
-        if not response.data or len(response.data) == 0:
+        if not rows:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Chart not found"
             )
         
-        return response.data[0]
+        return conditional(request, response, project(rows[0], wanted), raw=wanted is not None)
+    
+    except HTTPException:
+        raise
     
     except Exception as e:
         raise HTTPException(
@@ -84,46 +96,33 @@ async def get_chart(user_id: str, supabase: Client = Depends(get_supabase)):
         )
 
 @router.get("/{user_id}/tips", response_model=List[WorkplaceTip])
-async def get_workplace_tips(user_id: str, supabase: Client = Depends(get_supabase)):
+async def get_workplace_tips(
+    user_id: str,
+    db: Database = Depends(get_db),
+    tips_engine: TipsEngine = Depends(get_tips_engine),
+    materializer: Optional[ChartMaterializer] = Depends(get_chart_materializer),
+    user: Optional[AuthenticatedUser] = Depends(get_current_user)
+):
+    ensure_same_user(user, user_id)
+    
+    if materializer is not None:
+        await materializer.settle(user_id)
+    
     try:
-        # First get the user's chart
-        chart_response = supabase.table("charts").select("*").eq("user_id", user_id).execute()
+        # Same query as get_chart, so both share one cache entry
+        rows = await db.fetch(db.table("charts").select("*").eq("user_id", user_id), cache=f"charts:{user_id}")
         
-        if not chart_response.data or len(chart_response.data) == 0:
+        if not rows:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Chart not found"
             )
         
-        chart_data = chart_response.data[0]["chart_data"]
-        
-        # Generate tips based on chart data
-        # This is a simplified version - in a real app, you might use more sophisticated logic
-        # or even call an AI service to generate personalized tips
-        tips = [
-            WorkplaceTip(
-                tip="Set aside time each week to engage in activities you're passionate about",
-                category="passion"
-            ),
-            WorkplaceTip(
-                tip="Look for opportunities to apply your strongest skills in new contexts",
-                category="profession"
-            ),
-            WorkplaceTip(
-                tip="Connect your daily work to its broader impact on others",
-                category="mission"
-            ),
-            WorkplaceTip(
-                tip="Identify ways to monetize skills you enjoy using",
-                category="vocation"
-            ),
-            WorkplaceTip(
-                tip="Share your ikigai insights with your team to foster better collaboration",
-                category="teamwork"
-            ),
-        ]
-        
-        return tips
+        # Tips are memoised by chart content, so this only does work after the chart changes
+        return await tips_engine.tips_for(rows[0]["chart_data"])
+    
+    except HTTPException:
+        raise
     
     except Exception as e:
         raise HTTPException(
@@ -1,23 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from pydantic import BaseModel
 from typing import Optional
-import os
-from supabase import Client, create_client
 
-router = APIRouter()
+from services.auth_tokens import AuthenticatedUser, ensure_same_user, get_current_user
+from services.database import Database, get_db
+from services.etags import conditional
+from services.projection import parse_fields, project
+from services.signup_pipeline import avatar_url_for
 
-# Get Supabase client
-def get_supabase() -> Client:
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_KEY")
-    
-    if not supabase_url or not supabase_key:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Supabase configuration missing"
-        )
-    
-    return create_client(supabase_url, supabase_key)
+router = APIRouter()
 
 # Profile models
 class ProfileResponse(BaseModel):
@@ -34,17 +25,30 @@ class ProfileUpdateRequest(BaseModel):
     avatar_id: Optional[str] = None
 
 @router.get("/{user_id}", response_model=ProfileResponse)
-async def get_profile(user_id: str, supabase: Client = Depends(get_supabase)):
+async def get_profile(
+    user_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    db: Database = Depends(get_db),
+    user: Optional[AuthenticatedUser] = Depends(get_current_user)
+):
+    ensure_same_user(user, user_id)
+    columns, wanted = parse_fields(fields, ProfileResponse)
+    
     try:
-        response = supabase.table("profiles").select("*").eq("id", user_id).execute()
+        rows = await db.fetch(db.table("profiles").select(columns).eq("id", user_id), cache=f"profiles:{user_id}")
         
-        if not response.data or len(response.data) == 0:
+        if not rows:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Profile not found"
             )
         
-        return response.data[0]
+        return conditional(request, response, project(rows[0], wanted), raw=wanted is not None)
+    
+    except HTTPException:
+        raise
     
     except Exception as e:
         raise HTTPException(
@@ -56,8 +60,11 @@ async def get_profile(user_id: str, supabase: Client = Depends(get_supabase)):
 async def update_profile(
     user_id: str, 
     request: ProfileUpdateRequest, 
-    supabase: Client = Depends(get_supabase)
+    db: Database = Depends(get_db),
+    user: Optional[AuthenticatedUser] = Depends(get_current_user)
 ):
+    ensure_same_user(user, user_id)
+    
     try:
         # Prepare update data
         update_data = {}
@@ -66,7 +73,7 @@ async def update_profile(
         
         if request.avatar_id is not None:
             update_data["avatar_id"] = request.avatar_id
-            update_data["avatar_url"] = f"/images/avatar images/{request.avatar_id}.jpg"
+            update_data["avatar_url"] = avatar_url_for(request.avatar_id)
         
         if not update_data:
             raise HTTPException(
@@ -77,7 +84,8 @@ async def update_profile(
         # Update the profile
         update_data["updated_at"] = "now()"  # Use Supabase's now() function
         
-        response = supabase.table("profiles").update(update_data).eq("id", user_id).execute()
+        response = await db.execute(db.table("profiles").update(update_data).eq("id", user_id))
+        await db.invalidate(f"profiles:{user_id}")
         
         if not response.data or len(response.data) == 0:
             raise HTTPException(
@@ -87,6 +95,9 @@ async def update_profile(
         
         return response.data[0]
     
+    except HTTPException:
+        raise
+    
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,23 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel
 from typing import List, Optional
-import os
-from supabase import Client, create_client
 
-router = APIRouter()
+from services.auth_tokens import AuthenticatedUser, ensure_same_user, get_current_user
+from services.chart_materializer import ChartMaterializer, get_chart_materializer
+from services.database import Database, get_db
+from services.etags import conditional
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, keyset_page, split_page
+from services.projection import parse_fields, project
+from services.write_buffer import ResponseWriteBuffer, get_response_buffer
 
-# Get Supabase client
-def get_supabase() -> Client:
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_KEY")
-    
-    if not supabase_url or not supabase_key:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Supabase configuration missing"
-        )
-    
-    return create_client(supabase_url, supabase_key)
+router = APIRouter()
 
 # Response models
 class ResponseCreate(BaseModel):
@@ -27,34 +21,93 @@ class ResponseCreate(BaseModel):
     response: str
 
 class ResponseResponse(BaseModel):
-    id: str
+    id: Optional[str] = None  # None while a write-behind save is still buffered
     user_id: str
     pillar: str
     question_id: str
     response: str
     created_at: Optional[str] = None
+    updated_at: Optional[str] = None
 
 class ResponsesRequest(BaseModel):
     user_id: str
     pillar: Optional[str] = None
 
+class BatchItemResult(BaseModel):
+    index: int
+    question_id: str
+    status: str  # "saved" or "skipped"
+    response: Optional[ResponseResponse] = None
+    error: Optional[str] = None
+
+class BatchResponseResult(BaseModel):
+    saved: int
+    results: List[BatchItemResult]
+
+# completed: at least one answer per pillar, the rule the frontend has always
+# used; all_answered: every question on every pillar page
+class PillarProgress(BaseModel):
+    pillar: str
+    answered: int
+    required: int
+    completed: bool
+    all_answered: bool
+
+class ProgressResponse(BaseModel):
+    user_id: str
+    answered: int
+    required: int
+    completed: bool
+    all_answered: bool
+    pillars: List[PillarProgress]
+
+MAX_BATCH_SIZE = 100
+
+# Questions asked on each pillar page of the frontend
+REQUIRED_QUESTIONS = {
+    "passion": {"passion-1", "passion-2"},
+    "profession": {"profession-1", "profession-2"},
+    "mission": {"mission-1", "mission-2"},
+    "vocation": {"vocation-1", "vocation-2"},
+}
+
 @router.post("/", response_model=ResponseResponse)
-async def create_response(request: ResponseCreate, supabase: Client = Depends(get_supabase)):
+async def create_response(
+    request: ResponseCreate,
+    http_response: Response,
+    db: Database = Depends(get_db),
+    buffer: Optional[ResponseWriteBuffer] = Depends(get_response_buffer),
+    materializer: Optional[ChartMaterializer] = Depends(get_chart_materializer),
+    user: Optional[AuthenticatedUser] = Depends(get_current_user)
+):
+    ensure_same_user(user, request.user_id)
+    
+    # Buffered saves are only accepted, not stored yet, hence 202. A full
+    # buffer (the database is down or rejecting) falls through to a direct write
+    if buffer is not None and not buffer.full:
+        row = buffer.put(request.dict())
+        if materializer is not None:
+            materializer.mark(request.user_id, request.pillar)
+        http_response.status_code = status.HTTP_202_ACCEPTED
+        return row
+    
     try:
-        # Check if response already exists
-        existing = supabase.table("responses").select("*").eq("user_id", request.user_id).eq("pillar", request.pillar).eq("question_id", request.question_id).execute()
+        # Insert or update in one atomic statement, keyed on UNIQUE(user_id, question_id)
+        response = await db.execute(db.table("responses").upsert({
+            "user_id": request.user_id,
+            "pillar": request.pillar,
+            "question_id": request.question_id,
+            "response": request.response
+        }, on_conflict="user_id,question_id"))
+        await db.invalidate(f"responses:{request.user_id}")
         
-        if existing.data and len(existing.data) > 0:
-            # Update existing response
-            response = supabase.table("responses").update({"response": request.response}).eq("id", existing.data[0]["id"]).execute()
-        else:
-            # Create new response
-            response = supabase.table("responses").insert({
-                "user_id": request.user_id,
-                "pillar": request.pillar,
-                "question_id": request.question_id,
-                "response": request.response
-            }).execute()
+        # An older buffered value must not overwrite this one when it is flushed
+        if buffer is not None:
+            buffer.discard([(request.user_id, request.question_id)])
+        
+        # Only the chart sections that depend on this pillar are rebuilt
+        if materializer is not None:
+            materializer.mark(request.user_id, request.pillar)
         
         if not response.data or len(response.data) == 0:
             raise HTTPException(
@@ -64,23 +117,155 @@ async def create_response(request: ResponseCreate, supabase: Client = Depends(ge
         
         return response.data[0]
     
+    except HTTPException:
+        raise
+    
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to save response: {str(e)}"
         )
 
+@router.post("/batch", response_model=BatchResponseResult)
+async def create_responses_batch(
+    requests: List[ResponseCreate],
+    db: Database = Depends(get_db),
+    buffer: Optional[ResponseWriteBuffer] = Depends(get_response_buffer),
+    materializer: Optional[ChartMaterializer] = Depends(get_chart_materializer),
+    user: Optional[AuthenticatedUser] = Depends(get_current_user)
+):
+    if not requests:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No responses to save"
+        )
+    
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch can contain at most {MAX_BATCH_SIZE} responses"
+        )
+    
+    for item in requests:
+        ensure_same_user(user, item.user_id)
+    
+    # One statement cannot upsert the same key twice, so the last answer for a
+    # question wins and earlier duplicates are reported as skipped
+    latest = {}
+    for index, item in enumerate(requests):
+        latest[(item.user_id, item.question_id)] = index
+    
+    try:
+        response = await db.execute(db.table("responses").upsert([
+            {
+                "user_id": requests[index].user_id,
+                "pillar": requests[index].pillar,
+                "question_id": requests[index].question_id,
+                "response": requests[index].response
+            }
+            for index in sorted(latest.values())
+        ], on_conflict="user_id,question_id"))
+        await db.invalidate(*{f"responses:{user_id}" for user_id, _ in latest})
+        
+        # Buffered autosaves for these questions are now stale; they are kept
+        # if the upsert fails so the user's answers are not lost
+        if buffer is not None:
+            buffer.discard(latest.keys())
+        
+        if materializer is not None:
+            for index in latest.values():
+                materializer.mark(requests[index].user_id, requests[index].pillar)
+    
+    except HTTPException:
+        raise
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to save responses: {str(e)}"
+        )
+    
+    saved_rows = {(row["user_id"], row["question_id"]): row for row in response.data or []}
+    results = []
+    for index, item in enumerate(requests):
+        key = (item.user_id, item.question_id)
+        if latest[key] != index:
+            results.append(BatchItemResult(
+                index=index,
+                question_id=item.question_id,
+                status="skipped",
+                error="Superseded by a later answer in the same batch"
+            ))
+        elif key in saved_rows:
+            results.append(BatchItemResult(
+                index=index,
+                question_id=item.question_id,
+                status="saved",
+                response=saved_rows[key]
+            ))
+        else:
+            results.append(BatchItemResult(
+                index=index,
+                question_id=item.question_id,
+                status="skipped",
+                error="Response was not saved"
+            ))
+    
+    return BatchResponseResult(
+        saved=sum(1 for r in results if r.status == "saved"),
+        results=results
+    )
+
 @router.get("/", response_model=List[ResponseResponse])
-async def get_responses(user_id: str, pillar: Optional[str] = None, supabase: Client = Depends(get_supabase)):
+async def get_responses(
+    user_id: str,
+    request: Request,
+    response: Response,
+    pillar: Optional[str] = None,
+    since: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Database = Depends(get_db),
+    buffer: Optional[ResponseWriteBuffer] = Depends(get_response_buffer),
+    user: Optional[AuthenticatedUser] = Depends(get_current_user)
+):
+    ensure_same_user(user, user_id)
+    # The page key and the write-behind overlay need these columns whatever was asked for
+    columns, wanted = parse_fields(fields, ResponseResponse, always=("id", "created_at", "pillar", "question_id"))
+    after = decode_cursor(cursor) if cursor else None
+    
     try:
-        query = supabase.table("responses").select("*").eq("user_id", user_id)
+        # Buffered answers are stored before the page is cut, so a page never
+        # grows past limit and every row has the key the cursor needs
+        if buffer is not None and buffer.holds(user_id):
+            await buffer.flush()
+        
+        query = db.table("responses").select(columns).eq("user_id", user_id)
         
         if pillar:
             query = query.eq("pillar", pillar)
         
-        response = query.execute()
+        # Delta sync: only rows written after the client's last fetch
+        # (deletions are not reported; clients re-sync fully after deleting)
+        if since is not None:
+            query = query.gt("updated_at", since.isoformat())
+        
+        # Keyset pagination; X-Next-Cursor is set while more rows remain
+        query = keyset_page(query, after, limit)
+        rows, next_cursor = split_page(await db.fetch(query, cache=f"responses:{user_id}"), limit)
+        
+        # Only autosaves that arrived during the read are left to apply
+        if buffer is not None:
+            rows = buffer.overlay(user_id, rows, pillar, include_new=False)
+        
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
         
-        return response.data
+        return conditional(request, response, project(rows, wanted), raw=wanted is not None)
+    
+    except HTTPException:
+        raise
     
     except Exception as e:
         raise HTTPException(
@@ -88,10 +273,73 @@ async def get_responses(user_id: str, pillar: Optional[str] = None, supabase: Cl
             detail=f"Failed to get responses: {str(e)}"
         )
 
+@router.get("/{user_id}/progress", response_model=ProgressResponse)
+async def get_progress(
+    user_id: str,
+    db: Database = Depends(get_db),
+    buffer: Optional[ResponseWriteBuffer] = Depends(get_response_buffer),
+    user: Optional[AuthenticatedUser] = Depends(get_current_user)
+):
+    ensure_same_user(user, user_id)
+    
+    try:
+        # Only the two key columns, cached with the user's other response reads
+        query = db.table("responses").select("pillar,question_id").eq("user_id", user_id)
+        rows = await db.fetch(query, cache=f"responses:{user_id}")
+        
+        if buffer is not None:
+            rows = buffer.overlay(user_id, rows)
+        
+        answered = {}
+        for row in rows:
+            answered.setdefault(row["pillar"], set()).add(row["question_id"])
+        
+        pillars = [
+            PillarProgress(
+                pillar=pillar,
+                answered=len(required & answered.get(pillar, set())),
+                required=len(required),
+                completed=bool(answered.get(pillar)),
+                all_answered=required <= answered.get(pillar, set())
+            )
+            for pillar, required in REQUIRED_QUESTIONS.items()
+        ]
+        
+        return ProgressResponse(
+            user_id=user_id,
+            answered=sum(p.answered for p in pillars),
+            required=sum(p.required for p in pillars),
+            completed=all(p.completed for p in pillars),
+            all_answered=all(p.all_answered for p in pillars),
+            pillars=pillars
+        )
+    
+    except HTTPException:
+        raise
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get progress: {str(e)}"
+        )
+
 @router.delete("/{response_id}")
-async def delete_response(response_id: str, supabase: Client = Depends(get_supabase)):
+async def delete_response(
+    response_id: str,
+    db: Database = Depends(get_db),
+    buffer: Optional[ResponseWriteBuffer] = Depends(get_response_buffer),
+    materializer: Optional[ChartMaterializer] = Depends(get_chart_materializer),
+    user: Optional[AuthenticatedUser] = Depends(get_current_user)
+):
     try:
-        response = supabase.table("responses").delete().eq("id", response_id).execute()
+        query = db.table("responses").delete().eq("id", response_id)
+        
+        # Authenticated callers can only delete their own answers
+        if user is not None:
+            query = query.eq("user_id", user.id)
+        
+        response = await db.execute(query)
+        await db.invalidate(*{f"responses:{row['user_id']}" for row in response.data or []})
         
         if not response.data or len(response.data) == 0:
             raise HTTPException(
@@ -99,8 +347,19 @@ async def delete_response(response_id: str, supabase: Client = Depends(get_supab
                 detail="Response not found"
             )
         
+        # Don't let a pending autosave resurrect the deleted answer
+        if buffer is not None:
+            buffer.discard((row["user_id"], row["question_id"]) for row in response.data)
+        
+        if materializer is not None:
+            for row in response.data:
+                materializer.mark(row["user_id"], row["pillar"])
+        
         return {"message": "Response deleted successfully"}
     
+    except HTTPException:
+        raise
+    
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
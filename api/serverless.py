@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import os
@@ -8,8 +9,12 @@ import sys
 # Add the current directory to the path so we can import from the local modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Build the Supabase client and the Gemini model on first use, so a cold start
+# only pays for what the first request needs (see benchmarks/startup.py)
+os.environ.setdefault("LAZY_STARTUP", "true")
+
 # Import your existing app
-from api.main import app
+from api.main import app, start_services
 
 # Configure CORS for Vercel deployment
 origins = [
@@ -26,5 +31,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Mangum's lifespan support would start and stop every service on each
+# invocation, throwing away the connection pools and caches. Instead they are
+# started by the first request and live as long as the warm instance does.
+class StartOnFirstRequest:
+    def __init__(self, app: FastAPI):
+        self.app = app
+        self.started = False
+        self._lock = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not self.started:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if not self.started:
+                    await start_services(self.app)
+                    self.started = True
+        await self.app(scope, receive, send)
+        # Nothing runs while the instance is frozen between invocations, so
+        # write-behind saves are stored before this one ends
+        buffer = getattr(self.app.state, "response_buffer", None)
+        if buffer is not None:
+            await buffer.flush()
+
 # Create handler for serverless
-handler = Mangum(app)
+handler = Mangum(StartOnFirstRequest(app), lifespan="off")
@@ -0,0 +1,185 @@
+"""In-process verification of Supabase-issued access tokens.
+
+Checks signature, expiry and audience locally so identifying the caller does
+not cost a GoTrue round trip. Projects that sign with the shared JWT secret
+use HS256 (``SUPABASE_JWT_SECRET``). Projects with asymmetric signing keys
+are verified against the JWKS published by GoTrue. That key set is cached for
+``jwks_cache_ttl`` seconds and refetched early when a token names a key id
+it has not seen yet, which is what happens right after a key rotation.
+When the key set cannot be fetched or parsed, requests that need it get a
+503 rather than a 401, since the token itself may be fine.
+"""
+import asyncio
+import hmac
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+import jwt
+from fastapi import Depends, Header, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from pydantic import BaseModel
+
+from config import Settings
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256"]
+
+# Unknown key ids trigger a refetch at most this often
+MIN_JWKS_REFRESH_INTERVAL = 30.0
+
+
+class KeySetUnavailable(Exception):
+    """The JWKS could not be fetched or parsed."""
+
+
+class AuthenticatedUser(BaseModel):
+    id: str
+    email: Optional[str] = None
+    role: Optional[str] = None
+    claims: Dict[str, Any] = {}
+
+
+class TokenVerifier:
+    def __init__(self, settings: Settings):
+        self.secret = settings.supabase_jwt_secret
+        self.audience = settings.jwt_audience
+        self.jwks_url = settings.supabase_jwks_url or (
+            f"{settings.supabase_url}/auth/v1/.well-known/jwks.json"
+            if settings.supabase_url else None
+        )
+        self.jwks_cache_ttl = settings.jwks_cache_ttl
+        self._keys: Dict[str, Any] = {}
+        self._fetched_at = 0.0
+        self._failed_at: Optional[float] = None
+        self._refresh_lock = asyncio.Lock()
+
+    async def _refresh_keys(self, force: bool = False) -> None:
+        async with self._refresh_lock:
+            age = time.monotonic() - self._fetched_at
+            if age < (MIN_JWKS_REFRESH_INTERVAL if force else self.jwks_cache_ttl):
+                return  # another request refreshed while we waited
+            # Don't refetch on every request while the endpoint is failing
+            if self._failed_at is not None and time.monotonic() - self._failed_at < MIN_JWKS_REFRESH_INTERVAL:
+                raise KeySetUnavailable("JWKS endpoint failed recently")
+            try:
+                async with httpx.AsyncClient(timeout=5.0) as client:
+                    response = await client.get(self.jwks_url)
+                    response.raise_for_status()
+                payload = response.json()
+                if not isinstance(payload, dict):
+                    raise ValueError("JWKS is not a JSON object")
+                # Projects that only sign with HS256 publish {"keys": []}
+                keys = jwt.PyJWKSet.from_dict(payload).keys if payload.get("keys") else []
+            except (httpx.HTTPError, ValueError, jwt.PyJWKSetError) as e:
+                self._failed_at = time.monotonic()
+                logger.warning("Failed to load JWKS from %s: %s", self.jwks_url, e)
+                raise KeySetUnavailable(str(e)) from e
+            self._keys = {key.key_id: key for key in keys}
+            self._fetched_at = time.monotonic()
+            self._failed_at = None
+
+    async def _signing_key(self, kid: Optional[str]) -> Any:
+        if not self.jwks_url:
+            raise jwt.InvalidTokenError("No JWKS endpoint configured")
+        if time.monotonic() - self._fetched_at >= self.jwks_cache_ttl:
+            try:
+                await self._refresh_keys()
+            except KeySetUnavailable:
+                if not self._keys:
+                    raise  # otherwise keep verifying with the keys we have
+        if kid not in self._keys:
+            await self._refresh_keys(force=True)
+        if kid not in self._keys:
+            raise jwt.InvalidTokenError("Unknown signing key")
+        return self._keys[kid].key
+
+    async def verify(self, token: str) -> AuthenticatedUser:
+        """Return the caller described by ``token``.
+
+        Raises ``jwt.PyJWTError`` for a bad token and ``KeySetUnavailable``
+        when the JWKS needed to check it cannot be loaded.
+        """
+        header = jwt.get_unverified_header(token)
+        algorithm = header.get("alg")
+        if algorithm == "HS256" and self.secret:
+            key = self.secret
+        elif algorithm in ASYMMETRIC_ALGORITHMS:
+            key = await self._signing_key(header.get("kid"))
+        else:
+            raise jwt.InvalidAlgorithmError(f"Unsupported signing algorithm: {algorithm}")
+
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=self.audience,
+            options={"require": ["exp", "sub"]},
+        )
+        return AuthenticatedUser(
+            id=claims["sub"],
+            email=claims.get("email"),
+            role=claims.get("role"),
+            claims=claims,
+        )
+
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+# Dependency used by the routers. Returns None for anonymous calls unless
+# AUTH_REQUIRED is set; a token that is present must always be valid.
+async def get_current_user(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> Optional[AuthenticatedUser]:
+    if credentials is None:
+        if request.app.state.auth_required:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+        return None
+
+    verifier: TokenVerifier = request.app.state.token_verifier
+    try:
+        return await verifier.verify(credentials.credentials)
+    except KeySetUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Token signing keys are unavailable, please retry"
+        )
+    except jwt.PyJWTError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Invalid access token: {str(e)}",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+def ensure_same_user(user: Optional[AuthenticatedUser], user_id: str) -> None:
+    """Reject authenticated callers acting on another user's data."""
+    if user is not None and user.id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to access another user's data"
+        )
+
+
+# Dependency for the admin router: a shared key, since Supabase users have no
+# admin role. Without ADMIN_API_KEY the admin endpoints are switched off.
+def require_admin(request: Request, x_admin_key: Optional[str] = Header(None)) -> None:
+    expected = request.app.state.admin_api_key
+    if not expected:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found"
+        )
+    if x_admin_key is None or not hmac.compare_digest(x_admin_key.encode(), expected.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin key"
+        )
@@ -0,0 +1,157 @@
+"""Bulk export and import of user data as NDJSON.
+
+The export format is one JSON object per line, ``{"table": ..., "row": ...}``,
+with tables in dependency order (profiles, then charts, then responses) so a
+file can be imported as it is read. ``export_ndjson`` walks each table with
+keyset pagination over ``(created_at, id)`` and yields one page of lines at
+a time; ``import_ndjson`` parses lines as they arrive and upserts them in
+chunks of ``chunk_size`` rows on each table's natural key. Neither ever
+holds more than a page or a chunk of rows, so memory use stays flat however
+large the cohort is.
+
+Both bypass the read cache; imports invalidate the cached namespaces of the
+users they touched, chunk by chunk.
+"""
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+import orjson
+from fastapi import HTTPException, status
+
+from services.database import Database
+from services.pagination import MAX_PAGE_SIZE, keyset_page, split_page
+
+# Dependency order, and the key each table is upserted on
+TABLES = {
+    "profiles": "id",
+    "charts": "user_id",
+    "responses": "user_id,question_id",
+}
+
+DEFAULT_CHUNK_SIZE = 500
+
+# A single chart can be large, but nothing legitimate comes close to this
+MAX_LINE_BYTES = 4 * 1024 * 1024
+
+
+def parse_tables(tables: Optional[str]) -> List[str]:
+    """``"charts,responses"`` -> known table names in dependency order."""
+    if not tables:
+        return list(TABLES)
+    wanted = {name.strip() for name in tables.split(",") if name.strip()}
+    unknown = wanted - set(TABLES)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown tables: {', '.join(sorted(unknown))}"
+        )
+    return [name for name in TABLES if name in wanted]
+
+
+async def export_rows(
+    db: Database, tables: Iterable[str], page_size: int = MAX_PAGE_SIZE
+) -> AsyncIterator[Tuple[str, List[Dict[str, Any]]]]:
+    """Yield ``(table, rows)`` one keyset page at a time."""
+    for table in tables:
+        after = None
+        while True:
+            response = await db.execute(keyset_page(db.table(table).select("*"), after, page_size))
+            rows, cursor = split_page(response.data or [], page_size)
+            if rows:
+                yield table, rows
+            if cursor is None:
+                break
+            after = (rows[-1]["created_at"], rows[-1]["id"])
+
+
+async def export_ndjson(db: Database, tables: Iterable[str], page_size: int = MAX_PAGE_SIZE) -> AsyncIterator[bytes]:
+    async for table, rows in export_rows(db, tables, page_size):
+        yield b"".join(orjson.dumps({"table": table, "row": row}) + b"\n" for row in rows)
+
+
+async def split_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """Re-split an arbitrary byte stream into ``(line number, line)`` pairs."""
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            yield number, line
+        if len(buffer) > MAX_LINE_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Line {number + 1} is longer than {MAX_LINE_BYTES} bytes"
+            )
+    if buffer:
+        yield number + 1, buffer
+
+
+def parse_record(number: int, line: bytes) -> Tuple[str, Dict[str, Any]]:
+    try:
+        record = orjson.loads(line)
+        table, row = record["table"], record["row"]
+    except (orjson.JSONDecodeError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Line {number} is not a {{\"table\", \"row\"}} record"
+        )
+    if table not in TABLES or not isinstance(row, dict):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Line {number}: unknown table {table!r}"
+        )
+    return table, row
+
+
+def owner_of(table: str, row: Dict[str, Any]) -> Optional[str]:
+    return row.get("id") if table == "profiles" else row.get("user_id")
+
+
+class Importer:
+    """Buffers rows per table and upserts them in chunks."""
+
+    def __init__(self, db: Database, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.imported: Dict[str, int] = {table: 0 for table in TABLES}
+        self._table: Optional[str] = None
+        self._rows: List[Dict[str, Any]] = []
+
+    async def add(self, table: str, row: Dict[str, Any]) -> None:
+        # Flush on a table change so parents are written before their children
+        if table != self._table:
+            await self.flush()
+            self._table = table
+        self._rows.append(row)
+        if len(self._rows) >= self.chunk_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._rows:
+            return
+        table, rows = self._table, self._rows
+        self._rows = []
+        await self.db.execute(self.db.table(table).upsert(rows, on_conflict=TABLES[table]))
+        owners: Set[str] = {owner for owner in (owner_of(table, row) for row in rows) if owner}
+        await self.db.invalidate(*(f"{table}:{owner}" for owner in owners))
+        self.imported[table] += len(rows)
+
+
+async def import_ndjson(
+    db: Database, chunks: AsyncIterator[bytes], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """Upsert every record in an NDJSON byte stream; returns counts per table.
+
+    Chunks before a bad line have already been written when it is reported.
+    """
+    importer = Importer(db, chunk_size)
+    lines = 0
+    async for number, line in split_lines(chunks):
+        if not line.strip():
+            continue
+        table, row = parse_record(number, line)
+        await importer.add(table, row)
+        lines += 1
+    await importer.flush()
+    return {"lines": lines, "imported": importer.imported}
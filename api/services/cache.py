@@ -0,0 +1,214 @@
+"""Read-through cache for rows read from Supabase.
+
+Entries live in a namespace such as ``profiles:<user_id>``. Each namespace has
+a version token that is part of every key stored under it. Invalidating a
+namespace swaps the token, so all of its entries become unreachable at once,
+whatever query variants were cached, and then age out through TTL/LRU. A
+read that started before an invalidation stores its result under the old
+token, so it can never resurrect stale data.
+
+With ``stale_ttl`` set, every loaded value is also kept under a second,
+longer-lived key. When a load fails with one of the ``stale_on`` errors (the
+upstream is down), that copy is returned instead. It sits under the same
+version token, so data invalidated by a write is never served this way.
+
+Version tokens expire too, after ``version_ttl``: a day, or twice the longest
+entry lifetime if that is longer, so an idle namespace does not leave a key
+behind forever. A token always outlives the fresh and stale entries stored
+under it, and an expired token is replaced by a new random one, never the
+old value, so expiry can only cause misses and never brings stale entries
+back.
+
+``MemoryCache`` is the per-process backend. ``CacheBackend`` is the interface
+for a shared backend; ``RedisCache`` implements it when the optional
+``redis`` package is installed.
+"""
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+MISSING = object()
+
+# Minimum lifetime of a namespace's version token
+VERSION_TTL = 24 * 3600.0
+
+
+class CacheBackend:
+    """Interface for cache storage. Values must be JSON-serialisable."""
+
+    async def get(self, key: str) -> Any:
+        """Return the cached value, or ``MISSING``."""
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class NullCache(CacheBackend):
+    """Backend used when caching is disabled; never stores anything."""
+
+    async def get(self, key: str) -> Any:
+        return MISSING
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        pass
+
+    async def delete(self, key: str) -> None:
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU with per-entry expiry.
+
+    Values are stored by reference, so callers must not mutate what they get.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return MISSING
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+
+class RedisCache(CacheBackend):
+    """Shared backend for deployments running several API processes."""
+
+    def __init__(self, url: str, prefix: str = "ikigai:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Any:
+        raw = await self._redis.get(self.prefix + key)
+        return MISSING if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await self._redis.set(
+            self.prefix + key, json.dumps(value), px=int(ttl * 1000) if ttl else None
+        )
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(self.prefix + key)
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+
+class ReadThroughCache:
+    def __init__(self, backend: CacheBackend, ttl: float = 60.0, stale_ttl: float = 0.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.version_ttl = max(VERSION_TTL, 2 * max(ttl, stale_ttl))
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    async def _version(self, namespace: str) -> str:
+        version = await self.backend.get(f"v:{namespace}")
+        if version is MISSING:
+            version = uuid.uuid4().hex
+            await self.backend.set(f"v:{namespace}", version, self.version_ttl)
+        return version
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Awaitable[T]],
+        ttl: Optional[float] = None,
+        stale_on: Tuple[Type[BaseException], ...] = (),
+    ) -> T:
+        # The version must be read before loading, see the module docstring
+        full_key = f"{namespace}:{await self._version(namespace)}:{key}"
+        value = await self.backend.get(full_key)
+        if value is not MISSING:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        try:
+            value = await loader()
+        except stale_on:
+            stale = await self.backend.get(f"stale:{full_key}") if self.stale_ttl else MISSING
+            if stale is MISSING:
+                raise
+            self.stale_hits += 1
+            return stale
+        await self.backend.set(full_key, value, self.ttl if ttl is None else ttl)
+        if self.stale_ttl:
+            await self.backend.set(f"stale:{full_key}", value, self.stale_ttl)
+        return value
+
+    async def invalidate(self, *namespaces: str) -> None:
+        for namespace in namespaces:
+            await self.backend.set(f"v:{namespace}", uuid.uuid4().hex, self.version_ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        stats = {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+        if isinstance(self.backend, MemoryCache):
+            stats["entries"] = len(self.backend)
+            stats["evictions"] = self.backend.evictions
+        return stats
+
+
+def create_cache(
+    backend: str,
+    ttl: float,
+    max_entries: int,
+    redis_url: Optional[str] = None,
+    stale_ttl: float = 0.0,
+) -> ReadThroughCache:
+    if backend == "memory":
+        return ReadThroughCache(MemoryCache(max_entries), ttl, stale_ttl)
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("CACHE_BACKEND=redis requires CACHE_REDIS_URL")
+        return ReadThroughCache(RedisCache(redis_url), ttl, stale_ttl)
+    if backend == "none":
+        return ReadThroughCache(NullCache(), ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,183 @@
+"""Server-side materialisation of the ikigai chart from saved answers.
+
+Writes to ``responses`` mark the (user, pillar) they touched as dirty. A
+background task picks dirty users up after ``delay`` seconds, so a burst of
+autosaves costs one rebuild, and recomputes only what depends on the changed
+pillars: the pillar sections themselves and the intersections that include
+them. Those sections are merged into ``charts.chart_data`` by the
+``merge_chart_sections`` function (``supabase/chart_materialization.sql``),
+so the rest of the stored chart is never rewritten.
+
+Chart reads call ``settle`` first, which rebuilds a user's pending pillars
+inline, so a chart fetched right after saving an answer already reflects it.
+
+If the database does not have ``merge_chart_sections`` yet, the first
+rebuild logs one warning and switches materialisation off until restart.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from fastapi import Request
+
+from services.database import Database
+from services.write_buffer import ResponseWriteBuffer
+
+logger = logging.getLogger(__name__)
+
+PILLARS = ("passion", "profession", "mission", "vocation")
+
+# PostgREST's "function not found" error
+MISSING_FUNCTION = "PGRST202"
+
+# Derived sections and the pillars they combine, as drawn on the chart page
+INTERSECTIONS = {
+    "love": ("passion", "mission"),
+    "good": ("passion", "profession"),
+    "paid": ("profession", "vocation"),
+    "needs": ("mission", "vocation"),
+    "ikigai": PILLARS,
+}
+
+
+def split_answers(rows: Iterable[Dict[str, Any]]) -> List[str]:
+    """Flatten a pillar's answers; each one may hold several "|"-separated items."""
+    items = []
+    for row in sorted(rows, key=lambda r: r["question_id"]):
+        items.extend(part.strip() for part in row["response"].split("|") if part.strip())
+    return items
+
+
+def overlaps(a: str, b: str) -> bool:
+    a, b = a.lower(), b.lower()
+    return a in b or b in a
+
+
+def intersect(lists: List[List[str]]) -> List[str]:
+    """Items of the first list that overlap an item of every other list."""
+    result = lists[0]
+    for other in lists[1:]:
+        result = [item for item in result if any(overlaps(item, o) for o in other)]
+    return result
+
+
+def derived_sections(chart: Dict[str, Any], pillars: Iterable[str]) -> Dict[str, List[str]]:
+    changed = set(pillars)
+    return {
+        name: intersect([chart.get(p) or [] for p in combined])
+        for name, combined in INTERSECTIONS.items()
+        if changed.intersection(combined)
+    }
+
+
+class ChartMaterializer:
+    def __init__(self, db: Database, buffer: Optional[ResponseWriteBuffer] = None, delay: float = 0.5):
+        self.db = db
+        self.buffer = buffer
+        self.delay = delay
+        self.rebuilds = 0
+        self.disabled = False
+        self._dirty: Dict[str, Set[str]] = {}
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for user_id in list(self._dirty):
+            await self._rebuild_user(user_id)
+
+    def mark(self, user_id: str, pillar: str) -> None:
+        """Record that one of ``user_id``'s answers for ``pillar`` changed."""
+        if pillar not in PILLARS or self.disabled:
+            return
+        self._dirty.setdefault(user_id, set()).add(pillar)
+        self._wake.set()
+
+    async def settle(self, user_id: str) -> None:
+        """Bring ``user_id``'s stored chart up to date before it is read."""
+        if user_id in self._dirty or user_id in self._in_flight:
+            await self._rebuild_user(user_id)
+
+    async def _rebuild_user(self, user_id: str) -> None:
+        # One rebuild per user at a time; each one reads the sections the last wrote
+        while user_id in self._in_flight:
+            await asyncio.shield(self._in_flight[user_id])
+        pillars = self._dirty.pop(user_id, None)
+        if not pillars:
+            return
+
+        done = asyncio.get_running_loop().create_future()
+        self._in_flight[user_id] = done
+        try:
+            await self.rebuild(user_id, pillars)
+        except Exception as e:
+            if getattr(e, "code", None) == MISSING_FUNCTION:
+                self._disable()
+            else:
+                logger.exception("Failed to rebuild chart for user %s", user_id)
+                self._dirty.setdefault(user_id, set()).update(pillars)
+        finally:
+            del self._in_flight[user_id]
+            done.set_result(None)
+
+    def _disable(self) -> None:
+        if not self.disabled:
+            logger.warning(
+                "merge_chart_sections is missing from the database; chart materialisation "
+                "is off until supabase/chart_materialization.sql is applied and the API restarts"
+            )
+        self.disabled = True
+        self._dirty.clear()
+
+    async def rebuild(self, user_id: str, pillars: Set[str]) -> Dict[str, List[str]]:
+        """Recompute and store the chart sections that depend on ``pillars``."""
+        # Same query as GET /charts/{user_id}, so both share one cache entry
+        charts = await self.db.fetch(
+            self.db.table("charts").select("*").eq("user_id", user_id), cache=f"charts:{user_id}"
+        )
+        chart = dict(charts[0]["chart_data"]) if charts else {}
+
+        response = await self.db.execute(
+            self.db.table("responses")
+            .select("pillar,question_id,response")
+            .eq("user_id", user_id)
+            .in_("pillar", sorted(pillars))
+        )
+        rows = response.data or []
+        if self.buffer is not None:
+            rows = [r for r in self.buffer.overlay(user_id, rows) if r["pillar"] in pillars]
+
+        sections = {pillar: split_answers(r for r in rows if r["pillar"] == pillar) for pillar in pillars}
+        chart.update(sections)
+        sections.update(derived_sections(chart, pillars))
+
+        await self.db.execute(self.db.rpc(
+            "merge_chart_sections", {"p_user_id": user_id, "p_sections": sections}
+        ))
+        await self.db.invalidate(f"charts:{user_id}")
+        self.rebuilds += 1
+        return sections
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            # Let an autosave burst settle so it costs one rebuild
+            await asyncio.sleep(self.delay)
+            for user_id in list(self._dirty):
+                await self._rebuild_user(user_id)
+
+
+# Dependency used by the responses and charts routers; None when disabled
+def get_chart_materializer(request: Request) -> Optional[ChartMaterializer]:
+    return getattr(request.app.state, "chart_materializer", None)
@@ -0,0 +1,262 @@
+"""Async data-access layer over the synchronous Supabase SDK.
+
+supabase-py only ships blocking PostgREST/GoTrue calls. ``Database`` runs them
+on a bounded worker pool so the event loop keeps serving other requests while
+a round trip is in flight. Admission is capped at ``max_workers + max_queue``
+calls; anything beyond that waits up to ``queue_timeout`` seconds and is then
+rejected with a 503 instead of piling up behind a slow upstream.
+
+Reads that go through ``fetch`` are served from the read-through cache; the
+write paths call ``invalidate`` for the namespaces they touch.
+
+``fetch`` also coalesces identical concurrent reads (single flight): while a
+query is in flight, callers asking for the same query await that call
+instead of sending their own. Invalidating a namespace detaches its
+in-flight reads, so a read issued after a write never joins one that
+started before it. Plain ``execute`` calls are never coalesced; the write
+paths and read-after-write checks rely on them seeing their own writes.
+
+Every call goes through ``upstream`` (see ``services.resilience``): a
+deadline, retries and optional hedging for reads, and a circuit breaker.
+Errors that mean Supabase itself is unhealthy surface as
+``UpstreamUnavailable`` (503), and cached reads fall back to their last
+known rows while it lasts.
+"""
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException, Request, status
+
+from config import Settings
+from services.cache import ReadThroughCache
+from services.metrics import Metrics
+from services.resilience import CircuitBreaker, Upstream, UpstreamUnavailable
+from services.supabase_client import SupabaseProvider
+
+if TYPE_CHECKING:
+    from postgrest import APIResponse
+    from postgrest._sync.request_builder import SyncFilterRequestBuilder, SyncRequestBuilder
+    from supabase.lib.auth_client import SupabaseAuthClient
+
+T = TypeVar("T")
+
+
+class Database:
+    def __init__(
+        self,
+        provider: SupabaseProvider,
+        settings: Settings,
+        cache: ReadThroughCache,
+        metrics: Optional[Metrics] = None,
+    ):
+        self.provider = provider
+        self.cache = cache
+        self.metrics = metrics
+        self.max_workers = settings.db_max_workers
+        self.max_queue = settings.db_max_queue
+        self.queue_timeout = settings.db_queue_timeout
+        self.single_flight = settings.db_single_flight
+        self.lazy = settings.lazy_startup
+        self.coalesced = 0
+        self.upstream = Upstream(
+            "Database",
+            is_failure=lambda e: isinstance(e, UpstreamUnavailable),
+            deadline=settings.db_deadline or None,
+            retries=settings.db_read_retries,
+            retry_backoff=settings.db_retry_backoff,
+            hedge_after=settings.db_hedge_after,
+            breaker=CircuitBreaker(settings.db_breaker_failures, settings.db_breaker_reset),
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: Dict[str, Dict[str, asyncio.Future]] = {}
+
+    def start(self) -> None:
+        if not self.lazy:
+            self.provider.start()
+        # max_workers=0 runs calls inline on the event loop (the old behaviour)
+        if self.max_workers > 0:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="supabase"
+            )
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+
+    async def connect(self) -> None:
+        """With ``LAZY_STARTUP``, build the Supabase client on first use."""
+        if self.lazy:
+            await self.provider.ensure_started()
+
+    async def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.provider.close()
+        await self.cache.backend.close()
+
+    def table(self, name: str) -> "SyncRequestBuilder":
+        return self.provider.client.table(name)
+
+    def rpc(self, fn: str, params: Dict[str, Any]) -> "SyncFilterRequestBuilder":
+        return self.provider.client.rpc(fn, params)
+
+    def auth(self) -> "SupabaseAuthClient":
+        return self.provider.auth()
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking Supabase call without blocking the event loop.
+
+        The call gets a deadline and goes through the circuit breaker, but is
+        never retried: GoTrue calls and writes are not idempotent.
+        """
+        return await self.upstream.call(functools.partial(self._call, fn, *args, **kwargs))
+
+    async def _call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        try:
+            return await self._dispatch(fn, *args, **kwargs)
+        except Exception as e:
+            if is_unavailable(e):
+                raise UpstreamUnavailable("Database") from e
+            raise
+
+    async def _dispatch(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if self._executor is None:
+            return self._timed(fn, functools.partial(fn, *args, **kwargs))
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Database is busy, please retry"
+            )
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._executor, functools.partial(fn, *args, **kwargs)
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+        # The worker slot stays taken until the call returns, even when the
+        # caller stops waiting for it at its deadline
+        future.add_done_callback(functools.partial(self._settled, fn, time.perf_counter()))
+        return await asyncio.shield(future)
+
+    def _settled(self, fn: Callable[..., Any], started: float, future: asyncio.Future) -> None:
+        self._slots.release()
+        ok = not future.cancelled() and future.exception() is None
+        # Upstream time only; the wait for a worker slot is not included
+        self._observe(fn, time.perf_counter() - started, ok)
+
+    def _timed(self, fn: Callable[..., T], call: Callable[[], T]) -> T:
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = call()
+            ok = True
+            return result
+        finally:
+            self._observe(fn, time.perf_counter() - started, ok)
+
+    def _observe(self, fn: Callable[..., Any], seconds: float, ok: bool) -> None:
+        if self.metrics is not None:
+            upstream, operation = upstream_operation(fn)
+            self.metrics.observe_upstream(upstream, operation, seconds, ok)
+
+    async def execute(self, query: Any) -> "APIResponse":
+        """Execute a PostgREST query built from ``table(...)``.
+
+        Reads are idempotent, so they are also retried and may be hedged.
+        """
+        read = query.http_method in ("GET", "HEAD")
+        return await self.upstream.call(functools.partial(self._call, query.execute), idempotent=read)
+
+    async def fetch(self, query: Any, cache: str) -> List[Dict[str, Any]]:
+        """Return the rows for a read query, cached under namespace ``cache``."""
+        key = query_key(query)
+
+        async def load():
+            if not self.single_flight:
+                return (await self.execute(query)).data
+            return (await self._join_flight(cache, key, query)).data
+
+        # While Supabase is down, an expired copy beats an error
+        return await self.cache.get_or_load(cache, key, load, stale_on=(UpstreamUnavailable,))
+
+    async def _join_flight(self, namespace: str, key: str, query: Any) -> "APIResponse":
+        flights = self._in_flight.setdefault(namespace, {})
+        flight = flights.get(key)
+        if flight is None:
+            # A task of its own, so one caller giving up does not fail the others
+            flight = asyncio.ensure_future(self.execute(query))
+            flights[key] = flight
+            flight.add_done_callback(functools.partial(self._landed, namespace, key))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(flight)
+
+    def _landed(self, namespace: str, key: str, flight: asyncio.Future) -> None:
+        flights = self._in_flight.get(namespace)
+        if flights is not None and flights.get(key) is flight:
+            del flights[key]
+            if not flights:
+                del self._in_flight[namespace]
+        if not flight.cancelled():
+            flight.exception()  # retrieved here in case every waiter went away
+
+    async def invalidate(self, *namespaces: str) -> None:
+        for namespace in namespaces:
+            self._in_flight.pop(namespace, None)
+        await self.cache.invalidate(*namespaces)
+
+
+# PostgREST codes for "could not reach/connect to the database" and statement timeouts
+_UNAVAILABLE_CODES = {"PGRST000", "PGRST001", "PGRST002", "PGRST003"}
+
+
+def is_unavailable(exc: BaseException) -> bool:
+    """Whether a supabase-py error means PostgREST or GoTrue is unhealthy,
+    as opposed to rejecting this particular request."""
+    import httpx
+    from gotrue.errors import AuthRetryableError
+    from postgrest.exceptions import APIError
+
+    if isinstance(exc, (httpx.TransportError, AuthRetryableError)):
+        return True
+    if isinstance(exc, APIError):
+        # Non-JSON error bodies (gateway pages) carry the HTTP status as the code
+        code = exc.code
+        return code in _UNAVAILABLE_CODES or (isinstance(code, int) and code >= 500)
+    return (getattr(exc, "status", 0) or 0) >= 500
+
+
+def query_key(query: Any) -> str:
+    return f"{query.http_method} {query.path}?{query.params}"
+
+
+_VERBS = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+
+def upstream_operation(fn: Callable[..., Any]) -> Tuple[str, str]:
+    """Metric labels for a call passed to ``run``: PostgREST table + verb, or the GoTrue method."""
+    query = getattr(fn, "__self__", None)
+    if query is not None and hasattr(query, "http_method") and hasattr(query, "path"):
+        target = query.path.lstrip("/")
+        if target.startswith("rpc/"):
+            return "postgrest", target
+        verb = _VERBS.get(query.http_method, query.http_method.lower())
+        if verb == "insert" and "merge-duplicates" in query.headers.get("Prefer", ""):
+            verb = "upsert"
+        return "postgrest", f"{target} {verb}"
+    return "gotrue", getattr(fn, "__name__", "call")
+
+
+# Dependency used by the routers; with LAZY_STARTUP the first request that
+# needs Supabase builds the client here, off the event loop
+async def get_db(request: Request) -> Database:
+    db = request.app.state.db
+    await db.connect()
+    return db
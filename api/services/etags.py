@@ -0,0 +1,52 @@
+"""Conditional GET support for the read endpoints.
+
+The ETag is a digest of the JSON payload that would be returned, so it
+changes exactly when the data does, whichever write path changed it. A
+client that sends the tag back in ``If-None-Match`` gets an empty 304 and
+skips the download and parse of an unchanged body.
+
+``conditional`` also implements the trusted-rows fast path: with
+``TRUST_DATABASE_ROWS`` enabled, rows read from our own database are
+rendered straight to JSON by orjson instead of being re-validated through
+the route's pydantic response model.
+"""
+import hashlib
+from typing import Any, Optional
+
+import orjson
+from fastapi import Request, Response, status
+from fastapi.responses import ORJSONResponse
+
+
+def etag_for(payload: Any) -> str:
+    canonical = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS, default=str)
+    return f'W/"{hashlib.sha1(canonical).hexdigest()}"'
+
+
+def matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # Compare ignoring the weak prefix, as RFC 9110 asks for If-None-Match
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def conditional(request: Request, response: Response, payload: Any, raw: bool = False) -> Any:
+    """Tag ``response`` and return a 304 if the client already has ``payload``.
+
+    ``raw`` sends ``payload`` as-is instead of through the route's response
+    model, for sparse fieldsets that the model would reject. Trusted rows
+    always take that path; they are sent exactly as stored, so columns the
+    model does not declare are passed through too.
+    """
+    etag = etag_for(payload)
+    if matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    if raw or request.app.state.trust_database_rows:
+        return ORJSONResponse(payload, headers=dict(response.headers))
+    return payload
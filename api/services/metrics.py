@@ -0,0 +1,174 @@
+"""Request and upstream metrics in the Prometheus text exposition format.
+
+``MetricsMiddleware`` counts every request and records its latency per
+route template (``/profiles/{user_id}``, not the concrete path, so the label
+set stays bounded). ``Database`` and ``SuggestionService`` report each
+upstream call through ``Metrics.observe_upstream``: PostgREST calls are
+labelled by table and verb, GoTrue calls by auth operation and Gemini calls
+by model operation. ``GET /metrics`` renders everything with ``render``.
+
+With ``SERVER_TIMING`` enabled the middleware also adds a ``Server-Timing``
+header listing the upstream calls made for that request next to the total,
+which shows at a glance whether time went to our code, PostgREST, GoTrue or
+the model.
+
+Everything is updated from the event loop thread, so no locking is needed.
+"""
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# Upstream calls made while serving the current request, for Server-Timing
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = [*labels, *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(labels.items())
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(labels)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # Per label set: [count per bucket..., +Inf count], sum
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(labels.items())
+        counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+        total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labels, [('le', f'{bound:g}')])} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{_format_labels(labels, [('le', '+Inf')])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total[0]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Metrics:
+    def __init__(self):
+        self.requests = Counter(
+            "http_requests_total", "Requests handled, by route and status code."
+        )
+        self.request_latency = Histogram(
+            "http_request_duration_seconds", "Time to the end of the response, by route."
+        )
+        self.upstream_calls = Counter(
+            "upstream_requests_total", "Calls to Supabase and Gemini, by operation and outcome."
+        )
+        self.upstream_latency = Histogram(
+            "upstream_request_duration_seconds", "Duration of calls to Supabase and Gemini, by operation."
+        )
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float) -> None:
+        self.requests.inc(method=method, route=route, status=str(status))
+        self.request_latency.observe(seconds, method=method, route=route)
+
+    def observe_upstream(self, upstream: str, operation: str, seconds: float, ok: bool = True) -> None:
+        self.upstream_calls.inc(upstream=upstream, operation=operation, outcome="ok" if ok else "error")
+        self.upstream_latency.observe(seconds, upstream=upstream, operation=operation)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((f"{upstream};desc=\"{operation}\"", seconds))
+
+    def render(self) -> str:
+        lines = []
+        for metric in (self.requests, self.request_latency, self.upstream_calls, self.upstream_latency):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def server_timing(total: float, timings: List[Tuple[str, float]]) -> str:
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """ASGI middleware, so streamed (SSE) responses pass through untouched."""
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics: Optional[Metrics] = getattr(scope["app"].state, "metrics", None)
+        if metrics is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings: List[Tuple[str, float]] = []
+        token = _request_timings.set(timings)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    header = server_timing(time.perf_counter() - started, timings)
+                    message = {**message, "headers": [
+                        *message.get("headers", []), (b"server-timing", header.encode("latin-1"))
+                    ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timings.reset(token)
+            route = scope.get("route")
+            metrics.observe_request(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                status,
+                time.perf_counter() - started,
+            )
@@ -0,0 +1,54 @@
+"""Keyset pagination over (created_at, id).
+
+Pages are ordered by ``created_at`` with ``id`` as the tie-breaker (rows
+saved by one batch upsert share a timestamp). The cursor is the key of the
+last row on the previous page, so fetching page N costs the same as page 1,
+unlike an ``offset`` that the database has to skip over.
+"""
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+Key = Tuple[str, str]  # (created_at, id)
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    raw = json.dumps([row["created_at"], row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Key:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return str(created_at), str(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def keyset_page(query: Any, after: Optional[Key], limit: int) -> Any:
+    """Order ``query`` by the page key, start after ``after`` and over-fetch by one."""
+    if after is not None:
+        created_at, row_id = after
+        query.params = query.params.add(
+            "or",
+            f'(created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt."{row_id}"))'
+        )
+    # One order parameter; PostgREST reads the comma list as successive sort keys
+    return query.order("created_at,id").limit(limit + 1)
+
+
+def split_page(rows: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trim the look-ahead row and return the cursor for the next page, if any."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1])
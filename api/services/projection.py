@@ -0,0 +1,40 @@
+"""Sparse fieldsets for the read endpoints.
+
+``fields=id,username`` is validated against the endpoint's response model and
+pushed down into the PostgREST ``select``, so unused columns are neither
+transferred from Supabase nor serialised to the client. Columns a handler
+needs internally (keys, cursor columns) are always selected and trimmed off
+again by ``project`` before the payload is returned.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type, Union
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+
+Rows = Union[Dict[str, Any], List[Dict[str, Any]]]
+
+
+def parse_fields(
+    fields: Optional[str], model: Type[BaseModel], always: Sequence[str] = ()
+) -> Tuple[str, Optional[List[str]]]:
+    """Return the PostgREST select list and the requested fields (None = all)."""
+    if not fields:
+        return "*", None
+
+    wanted = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in wanted if f not in model.__fields__]
+    if unknown or not wanted:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown) or fields}"
+        )
+    columns = list(dict.fromkeys([*wanted, *always]))
+    return ",".join(columns), wanted
+
+
+def project(payload: Rows, wanted: Optional[List[str]]) -> Rows:
+    if wanted is None:
+        return payload
+    if isinstance(payload, list):
+        return [{f: row.get(f) for f in wanted} for row in payload]
+    return {f: payload.get(f) for f in wanted}
@@ -0,0 +1,194 @@
+"""Deadlines, retries, hedging and circuit breaking for upstream calls.
+
+``Upstream`` wraps every call the app makes to one dependency (Supabase or
+Gemini):
+
+- each attempt runs under a deadline and raises ``UpstreamTimeout`` (504)
+  when it misses it
+- idempotent calls are retried after failures with full-jitter exponential
+  backoff, so clients that failed together do not retry together
+- with ``hedge_after`` set, an idempotent call that has not answered by then
+  gets a second, identical attempt, and whichever finishes first wins; this
+  trims the latency tail at the cost of a few extra reads
+- a ``CircuitBreaker`` counts consecutive failures. Once open it rejects
+  calls straight away with ``UpstreamUnavailable`` (503) instead of letting
+  them queue behind a dead upstream, then lets a single trial call through
+  after ``reset_timeout``. Cached reads are served stale meanwhile, see
+  ``ReadThroughCache.get_or_load``
+
+Only failures that say the upstream is unhealthy (``is_failure``) are
+retried and counted by the breaker. Rejected requests, such as a constraint
+violation or a 4xx, mean the upstream is up and are raised unchanged.
+"""
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from fastapi import HTTPException, status
+
+T = TypeVar("T")
+
+
+class UpstreamUnavailable(HTTPException):
+    def __init__(self, upstream: str, status_code: int = status.HTTP_503_SERVICE_UNAVAILABLE, detail: Optional[str] = None):
+        super().__init__(status_code=status_code, detail=detail or f"{upstream} is unavailable, please retry")
+        self.upstream = upstream
+
+
+class UpstreamTimeout(UpstreamUnavailable):
+    def __init__(self, upstream: str):
+        super().__init__(upstream, status.HTTP_504_GATEWAY_TIMEOUT, f"{upstream} did not respond in time")
+
+
+class CircuitBreaker:
+    """Closed, then open after ``failure_threshold`` consecutive failures, then
+    half-open (one trial call) once ``reset_timeout`` seconds have passed."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        if self.failure_threshold <= 0:
+            return True
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial:
+            self._trial = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        # A failed trial call re-opens the circuit for another reset_timeout
+        if self._opened_at is not None or (0 < self.failure_threshold <= self.failures):
+            if self._opened_at is None:
+                self.opened += 1
+            self._opened_at = time.monotonic()
+        self._trial = False
+
+    def release(self) -> None:
+        """Give up a trial call that ended without a verdict (e.g. cancelled)."""
+        self._trial = False
+
+
+def _retrieve(task: asyncio.Future) -> None:
+    if not task.cancelled():
+        task.exception()
+
+
+class Upstream:
+    def __init__(
+        self,
+        name: str,
+        is_failure: Callable[[BaseException], bool],
+        deadline: Optional[float] = None,
+        retries: int = 0,
+        retry_backoff: float = 0.1,
+        hedge_after: float = 0.0,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.name = name
+        self.is_failure = is_failure
+        self.deadline = deadline
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker(failure_threshold=0)
+        self.retried = 0
+        self.hedged = 0
+        self.rejected = 0
+
+    def check(self) -> None:
+        """Fail fast while the circuit is open."""
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise UpstreamUnavailable(self.name)
+
+    def record(self, error: Optional[BaseException]) -> None:
+        """Report how a call made after ``check`` ended; ``None`` for success."""
+        if error is None or not self.is_failure(error):
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    async def call(self, attempt: Callable[[], Awaitable[T]], idempotent: bool = False) -> T:
+        """Run ``attempt`` (a fresh awaitable per call) under this upstream's policy."""
+        for number in range(self.retries + 1 if idempotent else 1):
+            self.check()
+            try:
+                result = await self._attempt(attempt, hedge=idempotent)
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                self.record(e)
+                last_try = number >= self.retries or not idempotent
+                if last_try or not self.is_failure(e) or self.breaker.state != "closed":
+                    raise
+                self.retried += 1
+                await asyncio.sleep(random.uniform(0, self.retry_backoff * 2 ** number))
+            else:
+                self.record(None)
+                return result
+
+    async def _deadline(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        if self.deadline is None:
+            return await attempt()
+        try:
+            return await asyncio.wait_for(attempt(), self.deadline)
+        except asyncio.TimeoutError:
+            raise UpstreamTimeout(self.name)
+
+    async def _attempt(self, attempt: Callable[[], Awaitable[T]], hedge: bool) -> T:
+        if not hedge or self.hedge_after <= 0:
+            return await self._deadline(attempt)
+
+        first = asyncio.ensure_future(self._deadline(attempt))
+        first.add_done_callback(_retrieve)
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done:
+                self.hedged += 1
+                second = asyncio.ensure_future(self._deadline(attempt))
+                second.add_done_callback(_retrieve)
+                tasks.append(second)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            return first.result()  # both failed; raise the first attempt's error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "circuit": self.breaker.state,
+            "opened": self.breaker.opened,
+            "rejected": self.rejected,
+            "retried": self.retried,
+            "hedged": self.hedged,
+        }
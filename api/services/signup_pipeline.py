@@ -0,0 +1,171 @@
+"""Background profile creation for new sign-ups.
+
+``sign_up`` returns tokens as soon as GoTrue has created the auth user and
+hands the profile row to this pipeline. A fixed number of worker tasks drain
+a bounded queue and retry failed writes with jittered exponential backoff.
+The write is an upsert keyed on the user id, so retries and duplicate
+submissions are harmless.
+
+The username and avatar are also stored in the auth user's metadata. The
+reconciler walks the auth users, finds the ones without a profile (for
+example after every retry failed or the process died mid-queue) and rebuilds
+their profiles from that metadata.
+"""
+import asyncio
+import logging
+import random
+from typing import List, Optional, Set
+
+from fastapi import Request
+from pydantic import BaseModel
+
+from services.database import Database
+
+logger = logging.getLogger(__name__)
+
+# Used for auth users created before the avatar was kept in their metadata
+DEFAULT_AVATAR_ID = "Ninja"
+
+RECONCILE_PAGE_SIZE = 200
+
+
+def avatar_url_for(avatar_id: str) -> str:
+    return f"/images/avatar images/{avatar_id}.jpg"
+
+
+class ProfileJob(BaseModel):
+    user_id: str
+    email: Optional[str] = None
+    username: str
+    avatar_id: str
+
+    def row(self) -> dict:
+        return {
+            "id": self.user_id,
+            "email": self.email,
+            "username": self.username,
+            "avatar_url": avatar_url_for(self.avatar_id),
+            "avatar_id": self.avatar_id
+        }
+
+
+class SignupPipeline:
+    def __init__(
+        self,
+        db: Database,
+        workers: int = 2,
+        max_queue: int = 1000,
+        max_attempts: int = 5,
+        retry_backoff: float = 0.5,
+        reconcile_interval: float = 0.0,
+    ):
+        self.db = db
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.reconcile_interval = reconcile_interval
+        self._queue: "asyncio.Queue[ProfileJob]" = asyncio.Queue(maxsize=max_queue)
+        self._queued: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        if self.reconcile_interval > 0:
+            self._tasks.append(asyncio.create_task(self._reconcile_periodically()))
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Stopping with %d profile jobs queued; the reconciler will repair them",
+                self._queue.qsize()
+            )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, job: ProfileJob) -> None:
+        if job.user_id in self._queued:
+            return
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            # Back-pressure: when the queue is full the caller pays for the write
+            await self.create_profile(job)
+            return
+        self._queued.add(job.user_id)
+
+    async def create_profile(self, job: ProfileJob) -> None:
+        await self.db.execute(self.db.table("profiles").upsert(job.row(), on_conflict="id"))
+        await self.db.invalidate(f"profiles:{job.user_id}")
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run_with_retries(job)
+            finally:
+                self._queued.discard(job.user_id)
+                self._queue.task_done()
+
+    async def _run_with_retries(self, job: ProfileJob) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self.create_profile(job)
+                return
+            except Exception:
+                if attempt == self.max_attempts:
+                    logger.exception(
+                        "Giving up on profile for user %s after %d attempts", job.user_id, attempt
+                    )
+                    return
+                delay = self.retry_backoff * 2 ** (attempt - 1)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+
+    async def reconcile(self) -> int:
+        """Queue profile creation for auth users that have no profile row."""
+        auth = self.db.auth()
+        repaired = 0
+        page = 1
+        while True:
+            users = await self.db.run(auth.admin.list_users, page=page, per_page=RECONCILE_PAGE_SIZE)
+            if not users:
+                break
+
+            ids = [user.id for user in users]
+            existing = await self.db.execute(self.db.table("profiles").select("id").in_("id", ids))
+            have_profile = {row["id"] for row in existing.data or []}
+
+            for user in users:
+                if user.id in have_profile:
+                    continue
+                metadata = user.user_metadata or {}
+                await self.submit(ProfileJob(
+                    user_id=user.id,
+                    email=user.email,
+                    username=metadata.get("username") or (user.email or "").split("@")[0],
+                    avatar_id=metadata.get("avatar_id") or DEFAULT_AVATAR_ID
+                ))
+                repaired += 1
+
+            if len(users) < RECONCILE_PAGE_SIZE:
+                break
+            page += 1
+        return repaired
+
+    async def _reconcile_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                repaired = await self.reconcile()
+                if repaired:
+                    logger.info("Queued %d missing profiles", repaired)
+            except Exception:
+                logger.warning("Profile reconciliation failed", exc_info=True)
+
+
+# Dependency used by the auth router
+def get_signup_pipeline(request: Request) -> SignupPipeline:
+    return request.app.state.signup_pipeline
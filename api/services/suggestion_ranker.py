@@ -0,0 +1,161 @@
+"""Local suggestion ranking with hashed n-gram TF-IDF vectors.
+
+Every pillar's phrase corpus is turned into a dense NumPy matrix once, at
+start-up: words and character trigrams are hashed into ``DIMENSIONS``
+buckets, weighted by TF-IDF and L2-normalised. Ranking the user's text is
+then a single matrix-vector product plus a sort of the scores, well under a
+millisecond and with no network. The trigrams make the match tolerant of
+inflections and typos ("paint", "painting", "pianting").
+
+The corpus starts from the per-pillar lists the Next.js
+``pages/api/suggestions`` route used to shuffle.
+"""
+import re
+import zlib
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+DIMENSIONS = 2 ** 12
+
+CORPUS: Dict[str, List[str]] = {
+    "passion": [
+        "Drawing or painting",
+        "Writing stories or poetry",
+        "Playing musical instruments",
+        "Cooking new recipes",
+        "Gardening",
+        "Photography",
+        "Hiking and exploring nature",
+        "Reading books",
+        "Learning languages",
+        "Teaching others",
+        "Solving puzzles",
+        "Playing sports",
+        "Meditation or yoga",
+        "Volunteering",
+        "Crafting or DIY projects",
+    ],
+    "profession": [
+        "Public speaking",
+        "Writing clearly",
+        "Problem-solving",
+        "Critical thinking",
+        "Leadership",
+        "Organization",
+        "Technical skills",
+        "Creative thinking",
+        "Research abilities",
+        "Analytical skills",
+        "Attention to detail",
+        "Adaptability",
+        "Communication",
+        "Teamwork",
+        "Project management",
+    ],
+    "mission": [
+        "Environmental conservation",
+        "Education access",
+        "Healthcare improvement",
+        "Poverty reduction",
+        "Mental health awareness",
+        "Animal welfare",
+        "Elderly care",
+        "Child development",
+        "Community building",
+        "Arts and culture preservation",
+        "Technological literacy",
+        "Sustainable living",
+        "Social justice",
+        "Disaster relief",
+        "Food security",
+    ],
+    "vocation": [
+        "Consulting services",
+        "Teaching or tutoring",
+        "Content creation",
+        "Software development",
+        "Design services",
+        "Financial planning",
+        "Health and wellness coaching",
+        "Marketing strategy",
+        "Event planning",
+        "Project management",
+        "Research and analysis",
+        "Translation services",
+        "Career coaching",
+        "Technical writing",
+        "Virtual assistance",
+    ],
+}
+
+# Too common to say anything about what the user wrote
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from i i'm in is it its like love me my "
+    "of on or so that the this to want we with you".split()
+)
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def features(text: str) -> List[str]:
+    """Words plus the character trigrams of each word, e.g. ``#pa``, ``pai``."""
+    words = [w for w in _WORD.findall(text.lower()) if w not in STOP_WORDS]
+    grams = list(words)
+    for word in words:
+        padded = f"#{word}#"
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def bucket(feature: str) -> int:
+    # crc32 rather than hash(): str hashing is salted per process
+    return zlib.crc32(feature.encode("utf-8")) % DIMENSIONS
+
+
+def term_counts(text: str) -> np.ndarray:
+    counts = np.zeros(DIMENSIONS, dtype=np.float32)
+    for feature in features(text):
+        counts[bucket(feature)] += 1.0
+    return counts
+
+
+class SuggestionRanker:
+    def __init__(self, corpus: Dict[str, Iterable[str]] = CORPUS):
+        self._phrases: Dict[str, List[str]] = {}
+        self._matrices: Dict[str, np.ndarray] = {}
+
+        phrases = {pillar: list(items) for pillar, items in corpus.items()}
+        all_phrases = [p for items in phrases.values() for p in items]
+        counts = np.stack([term_counts(p) for p in all_phrases])
+
+        # Smoothed IDF over the whole corpus, so scores are comparable across pillars
+        document_frequency = (counts > 0).sum(axis=0)
+        self._idf = (np.log((1 + len(all_phrases)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        start = 0
+        for pillar, items in phrases.items():
+            block = counts[start:start + len(items)]
+            start += len(items)
+            self._phrases[pillar] = items
+            self._matrices[pillar] = self._weigh(block)
+
+    def _weigh(self, counts: np.ndarray) -> np.ndarray:
+        weights = np.log1p(counts) * self._idf
+        norms = np.linalg.norm(weights, axis=-1, keepdims=True)
+        return weights / np.maximum(norms, 1e-12)
+
+    def scored(self, pillar: str, text: str, limit: int = 3) -> List[Tuple[str, float]]:
+        """Return up to ``limit`` (phrase, cosine score) pairs, best first."""
+        matrix = self._matrices.get(pillar.strip().lower())
+        if matrix is None:
+            return []
+        phrases = self._phrases[pillar.strip().lower()]
+
+        scores = matrix @ self._weigh(term_counts(text))
+        # Stable on ties, so an empty or unmatched text gives the corpus order
+        top = np.argsort(-scores, kind="stable")[:limit]
+        return [(phrases[i], float(scores[i])) for i in top]
+
+    def rank(self, pillar: str, text: str, limit: int = 3) -> List[str]:
+        return [phrase for phrase, _ in self.scored(pillar, text, limit)]
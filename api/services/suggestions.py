@@ -0,0 +1,415 @@
+"""Gemini-backed suggestion engine for the ``/ai`` endpoints.
+
+One ``GenerativeModel`` is reused for every request. ``generate_content`` is
+blocking, so it runs on a small dedicated thread pool under a hard deadline.
+At most ``max_concurrency`` generations are in flight and at most
+``max_queue`` more may wait for a slot; beyond that callers get
+``SuggestionServiceBusy`` straight away. Results are memoised in an LRU keyed
+by the normalised (pillar, text), so repeated and near-identical prompts
+skip the model entirely. Cache misses that arrive together are micro-batched
+into a single model call, see ``services.suggestion_batcher``.
+
+``stream`` is the incremental variant: the model's streamed chunks are fed to
+a ``SuggestionStreamParser`` and each suggestion is yielded as soon as the
+comma that ends it arrives.
+
+``SuggestionRanker`` answers locally in front of Gemini. Its suggestions are
+returned straight away when they match the text closely enough, when no
+``GEMINI_API_KEY`` is configured, and when the model call fails or misses its
+deadline.
+
+Model calls go through a circuit breaker (``services.resilience``). After a
+run of failures it rejects calls straight away, so requests are answered by
+the ranker instead of each waiting out the deadline.
+
+The Gemini SDK and numpy (for the ranker) are only imported when first
+needed. With ``LAZY_STARTUP`` the model and the ranker are also built on the
+first ``/ai`` call instead of in ``start``, which keeps both off the
+serverless cold-start path.
+"""
+import asyncio
+import functools
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import TYPE_CHECKING, AsyncIterator, List, Optional, Tuple
+
+from fastapi import Request
+
+from config import Settings
+from services.cache import MISSING, MemoryCache
+from services.metrics import Metrics
+from services.resilience import CircuitBreaker, Upstream
+from services.suggestion_batcher import SuggestionBatcher
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+
+    from services.suggestion_ranker import SuggestionRanker
+
+logger = logging.getLogger(__name__)
+
+MAX_SUGGESTIONS = 3
+
+PROMPT_TEMPLATE = """
+        The user is filling out a section about their ikigai (life purpose) related to the pillar: {pillar}.
+        They wrote: "{text}"
+
+        Based on what they wrote, suggest 3 clarifying words or phrases that might help them articulate their thoughts better.
+        Each suggestion should be concise (1-3 words) and directly related to what they wrote.
+        Return only the suggestions as a comma-separated list, nothing else.
+        """
+
+_PUNCTUATION = re.compile(r"[^\w\s']+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class SuggestionServiceBusy(Exception):
+    pass
+
+
+class SuggestionTimeout(Exception):
+    pass
+
+
+def is_model_failure(exc: BaseException) -> bool:
+    """Whether a model call failed because Gemini is unhealthy or overloaded;
+    rejected prompts (4xx other than 429) and our own queue limit don't count."""
+    if isinstance(exc, SuggestionTimeout):
+        return True
+    if isinstance(exc, SuggestionServiceBusy):
+        return False
+    from google.api_core import exceptions as api_exceptions
+
+    if isinstance(exc, api_exceptions.ClientError):
+        return isinstance(exc, api_exceptions.TooManyRequests)
+    return True
+
+
+def normalize(pillar: str, text: str) -> str:
+    """Cache key that ignores case, punctuation and spacing differences."""
+    text = _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+    return f"{pillar.strip().lower()}|{text}"
+
+
+def parse_suggestions(raw: str) -> List[str]:
+    suggestions = [s.strip() for s in raw.split(",")]
+    return [s for s in suggestions if s][:MAX_SUGGESTIONS]
+
+
+class SuggestionStreamParser:
+    """Split a comma-separated reply into suggestions as its chunks arrive."""
+
+    def __init__(self, limit: int = MAX_SUGGESTIONS):
+        self.limit = limit
+        self.suggestions: List[str] = []
+        self._buffer = ""
+
+    @property
+    def done(self) -> bool:
+        return len(self.suggestions) >= self.limit
+
+    def feed(self, chunk: str) -> List[str]:
+        """Return the suggestions completed by ``chunk``."""
+        *complete, self._buffer = (self._buffer + chunk).split(",")
+        return self._take(complete)
+
+    def close(self) -> List[str]:
+        """Return the final suggestion, which has no trailing comma."""
+        rest, self._buffer = self._buffer, ""
+        return self._take([rest])
+
+    def _take(self, parts: List[str]) -> List[str]:
+        new = []
+        for part in parts:
+            part = part.strip()
+            if part and not self.done:
+                self.suggestions.append(part)
+                new.append(part)
+        return new
+
+
+# Marks the end of a streamed reply on the chunk queue
+_END = object()
+
+
+class SuggestionService:
+    def __init__(self, settings: Settings, metrics: Optional[Metrics] = None):
+        self.metrics = metrics
+        self.api_key = settings.gemini_api_key
+        self.model_name = settings.gemini_model
+        self.api_endpoint = settings.gemini_api_endpoint
+        self.timeout = settings.suggestion_timeout
+        self.max_concurrency = settings.suggestion_max_concurrency
+        self.max_queue = settings.suggestion_max_queue
+        self.cache_ttl = settings.suggestion_cache_ttl
+        self.batch_window = settings.suggestion_batch_window
+        self.max_batch_size = settings.suggestion_max_batch_size
+        self.local_fallback = settings.suggestion_local_fallback
+        self.local_first_score = settings.suggestion_local_first_score
+        self.lazy = settings.lazy_startup
+        self._cache = MemoryCache(settings.suggestion_cache_size)
+        self._model: Optional["genai.GenerativeModel"] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self._batcher: Optional[SuggestionBatcher] = None
+        # Deadlines are enforced per call above (``timeout``), not by the wrapper
+        self.upstream = Upstream(
+            "Gemini",
+            is_failure=is_model_failure,
+            retries=settings.suggestion_retries,
+            breaker=CircuitBreaker(settings.suggestion_breaker_failures, settings.suggestion_breaker_reset),
+        )
+
+    @cached_property
+    def ranker(self) -> "SuggestionRanker":
+        from services.suggestion_ranker import SuggestionRanker
+
+        return SuggestionRanker()
+
+    @property
+    def model(self) -> "genai.GenerativeModel":
+        if self._model is None:
+            import google.generativeai as genai
+
+            if self.api_endpoint:
+                genai.configure(
+                    api_key=self.api_key,
+                    transport="rest",
+                    client_options={"api_endpoint": self.api_endpoint},
+                )
+            else:
+                genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def start(self) -> None:
+        if not self.lazy:
+            self.ranker
+        if not self.api_key:
+            return  # local suggestions only
+        if not self.lazy:
+            self.model
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="gemini"
+        )
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        if self.max_batch_size > 1:
+            self._batcher = SuggestionBatcher(
+                self._generate,
+                self._single,
+                window=self.batch_window,
+                max_batch_size=self.max_batch_size,
+                limit=MAX_SUGGESTIONS,
+            )
+
+    def close(self) -> None:
+        if self._batcher is not None:
+            self._batcher.close()
+            self._batcher = None
+        if self._executor is not None:
+            # Don't wait for calls that already blew their deadline
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _check_capacity(self) -> None:
+        if self._waiting >= self.max_queue and self._slots.locked():
+            raise SuggestionServiceBusy()
+
+    async def _acquire(self) -> None:
+        self._check_capacity()
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+    async def _generate(self, prompt: str) -> str:
+        return await self.upstream.call(functools.partial(self._generate_once, prompt), idempotent=True)
+
+    async def _generate_once(self, prompt: str) -> str:
+        model = self.model
+        await self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._executor, model.generate_content, prompt)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot stays taken until the call returns, even when the caller
+        # stops waiting for it at its deadline
+        future.add_done_callback(functools.partial(self._settled, time.perf_counter()))
+        try:
+            response = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise SuggestionTimeout()
+        return response.text
+
+    def _settled(self, started: float, future: asyncio.Future) -> None:
+        self._slots.release()
+        ok = not future.cancelled() and future.exception() is None
+        self._observe("generate_content", started, ok)
+
+    def _observe(self, operation: str, started: float, ok: bool) -> None:
+        if self.metrics is not None:
+            self.metrics.observe_upstream("gemini", operation, time.perf_counter() - started, ok)
+
+    async def _single(self, pillar: str, text: str) -> List[str]:
+        raw = await self._generate(PROMPT_TEMPLATE.format(pillar=pillar, text=text))
+        return parse_suggestions(raw)
+
+    def _rank_locally(self, pillar: str, text: str) -> Tuple[List[str], bool]:
+        """Local suggestions, and whether to answer with them without asking Gemini."""
+        scored = self.ranker.scored(pillar, text, MAX_SUGGESTIONS)
+        confident = bool(scored) and 0 < self.local_first_score <= scored[0][1]
+        return [phrase for phrase, _ in scored], confident or not self.api_key
+
+    def _can_fall_back(self, local: List[str]) -> bool:
+        if not (self.local_fallback and local):
+            return False
+        logger.warning("Gemini suggestions failed, serving local ones", exc_info=True)
+        return True
+
+    async def suggest(self, pillar: str, text: str) -> List[str]:
+        local, skip_model = self._rank_locally(pillar, text)
+        if skip_model:
+            return local
+
+        key = normalize(pillar, text)
+        cached = await self._cache.get(key)
+        if cached is not MISSING:
+            return cached
+
+        try:
+            if self._batcher is not None:
+                suggestions = await self._batcher.submit(key, pillar, text)
+            else:
+                suggestions = await self._single(pillar, text)
+        except Exception:
+            if not self._can_fall_back(local):
+                raise
+            return local
+        await self._cache.set(key, suggestions, self.cache_ttl)
+        return suggestions
+
+    def stream(self, pillar: str, text: str) -> AsyncIterator[str]:
+        """Yield suggestions one by one while the model is still generating.
+
+        Without the local fallback this raises ``SuggestionServiceBusy`` right
+        away, before anything has been streamed, so callers can still answer
+        with a plain 503.
+        """
+        if self.api_key and not self.local_fallback:
+            self._check_capacity()
+        return self._stream(pillar, text)
+
+    async def _stream(self, pillar: str, text: str) -> AsyncIterator[str]:
+        local, skip_model = self._rank_locally(pillar, text)
+        if skip_model:
+            for suggestion in local:
+                yield suggestion
+            return
+
+        streamed = False
+        model_stream = self._stream_model(pillar, text)
+        try:
+            async for suggestion in model_stream:
+                streamed = True
+                yield suggestion
+        except Exception:
+            if streamed or not self._can_fall_back(local):
+                raise
+            for suggestion in local:
+                yield suggestion
+        finally:
+            await model_stream.aclose()
+
+    async def _stream_model(self, pillar: str, text: str) -> AsyncIterator[str]:
+        key = normalize(pillar, text)
+        cached = await self._cache.get(key)
+        if cached is not MISSING:
+            for suggestion in cached:
+                yield suggestion
+            return
+
+        model = self.model
+        self.upstream.check()
+        try:
+            await self._acquire()
+        except BaseException:
+            self.upstream.breaker.release()
+            raise
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def emit(item) -> None:
+            try:
+                loop.call_soon_threadsafe(chunks.put_nowait, item)
+            except RuntimeError:
+                pass  # loop already closed; nobody is listening
+
+        def produce() -> None:
+            try:
+                response = model.generate_content(
+                    PROMPT_TEMPLATE.format(pillar=pillar, text=text), stream=True
+                )
+                for chunk in response:
+                    if stop.is_set():
+                        return
+                    emit(chunk.text)
+                emit(_END)
+            except Exception as e:
+                emit(e)
+
+        try:
+            producer = loop.run_in_executor(self._executor, produce)
+        except BaseException:
+            self._slots.release()
+            self.upstream.breaker.release()
+            raise
+        # As in _generate_once, the slot is held until the thread returns
+        producer.add_done_callback(lambda _: self._slots.release())
+
+        parser = SuggestionStreamParser()
+        deadline = loop.time() + self.timeout
+        started = time.perf_counter()
+        ok = False
+        error: Optional[BaseException] = None
+        try:
+            while not parser.done:
+                try:
+                    item = await asyncio.wait_for(chunks.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    raise SuggestionTimeout()
+                if item is _END:
+                    for suggestion in parser.close():
+                        yield suggestion
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                for suggestion in parser.feed(item):
+                    yield suggestion
+            ok = True
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Also runs when the client disconnects and the generator is closed
+            stop.set()
+            self._observe("stream_generate_content", started, ok)
+            if ok or error is not None:
+                self.upstream.record(error)
+            else:
+                self.upstream.breaker.release()
+
+        await self._cache.set(key, parser.suggestions, self.cache_ttl)
+
+
+# Dependency used by the AI router
+def get_suggestion_service(request: Request) -> SuggestionService:
+    return request.app.state.suggestions
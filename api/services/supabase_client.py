@@ -0,0 +1,135 @@
+"""Process-wide Supabase client provider.
+
+A single ``SupabaseProvider`` is created by the application lifespan. It owns
+keep-alive connection pools for PostgREST and GoTrue so requests reuse warm
+connections instead of paying a TCP+TLS handshake each time.
+
+The Supabase SDK is imported by ``start``, not by this module. With
+``LAZY_STARTUP`` the application does not call ``start`` at all: the client
+is built on first use, so a serverless cold start that never touches the
+database (``/health``, ``/ai``) never loads the SDK. ``ensure_started`` does
+that first build on a worker thread, so it does not stall the event loop, and
+``start`` holds a lock so concurrent first uses build one client between them.
+"""
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Dict, Optional
+
+from config import Settings
+
+if TYPE_CHECKING:
+    from postgrest.utils import SyncClient
+    from supabase import Client
+    from supabase.lib.auth_client import SupabaseAuthClient
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class SupabaseProvider:
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self._client: Optional["Client"] = None
+        self._auth_http: Optional["SyncClient"] = None
+        self._auth_headers: Dict[str, str] = {}
+        self._start_lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._client is not None
+
+    async def ensure_started(self) -> None:
+        """Build the client off the event loop if it does not exist yet."""
+        if self._client is None:
+            await asyncio.get_running_loop().run_in_executor(None, self.start)
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._client is None:
+                self._start()
+
+    def _start(self) -> None:
+        settings = self.settings
+        if not settings.supabase_url or not settings.supabase_key:
+            raise ValueError("Missing Supabase environment variables")
+
+        import httpx
+        from postgrest.utils import SyncClient
+        from supabase import create_client
+        from supabase.lib.client_options import ClientOptions
+
+        limits = httpx.Limits(
+            max_connections=settings.supabase_pool_size,
+            max_keepalive_connections=settings.supabase_pool_keepalive,
+            keepalive_expiry=settings.supabase_keepalive_expiry,
+        )
+        timeout = httpx.Timeout(
+            settings.supabase_timeout, connect=settings.supabase_connect_timeout
+        )
+        http2 = settings.supabase_http2 and _http2_available()
+
+        # The shared client must never hold a user session, so token refresh
+        # and session persistence are disabled.
+        options = ClientOptions(
+            auto_refresh_token=False,
+            persist_session=False,
+            postgrest_client_timeout=timeout,
+        )
+        client = create_client(settings.supabase_url, settings.supabase_key, options)
+
+        # Swap the PostgREST session for a pooled one with the same base URL/headers
+        rest_session = client.postgrest.session
+        client.postgrest.session = SyncClient(
+            base_url=rest_session.base_url,
+            headers=rest_session.headers,
+            timeout=timeout,
+            limits=limits,
+            http2=http2,
+        )
+        rest_session.close()
+
+        self._auth_http = SyncClient(timeout=timeout, limits=limits, http2=http2)
+        self._auth_headers = dict(options.headers)
+        self._client = client
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.postgrest.session.close()
+            self._client.storage.session.close()
+            self._client = None
+        if self._auth_http is not None:
+            self._auth_http.close()
+            self._auth_http = None
+
+    @property
+    def client(self) -> "Client":
+        """The shared client. PostgREST request builders are stateless, so
+        table queries from every request can go through it."""
+        if self._client is None:
+            if not self.settings.lazy_startup:
+                raise RuntimeError("Supabase provider has not been started")
+            self.start()
+        return self._client
+
+    def auth(self) -> "SupabaseAuthClient":
+        """Return a request-scoped GoTrue client bound to the shared pool.
+
+        GoTrue keeps the signed-in session on the client object, so sharing
+        one instance would leak sessions between requests.
+        """
+        from gotrue import SyncMemoryStorage
+        from supabase.lib.auth_client import SupabaseAuthClient
+
+        return SupabaseAuthClient(
+            url=self.client.auth_url,
+            headers=self._auth_headers,
+            auto_refresh_token=False,
+            persist_session=False,
+            storage=SyncMemoryStorage(),
+            http_client=self._auth_http,
+        )
@@ -0,0 +1,251 @@
+"""Personalised workplace tips computed from a saved ikigai chart.
+
+The catalogue below is compiled once, at import, into an inverted index from
+``(pillar, stem)`` to the tips that mention that stem. Tips for a chart are
+found by looking up each word of each pillar section, so the cost grows with
+the size of the chart and not with the size of the catalogue. Every pillar
+gets its best keyword match, or a generic tip when nothing matched. Empty
+intersections (``ikigai``, ``love``, ``good``, ``paid``, ``needs``) add a
+gap tip.
+
+Results only depend on ``chart_data``, so they are memoised under a hash of
+its canonical JSON and recomputed only when the chart content changes.
+"""
+import hashlib
+import json
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from fastapi import Request
+
+from services.cache import MISSING, MemoryCache
+
+PILLARS = ("passion", "profession", "mission", "vocation")
+
+# Chart sections derived from the pillars, in the order their gap tips are given
+INTERSECTIONS = ("ikigai", "love", "good", "paid", "needs")
+
+MAX_GAP_TIPS = 2
+
+
+class CatalogueTip(NamedTuple):
+    tip: str
+    pillars: Tuple[str, ...]
+    keywords: Tuple[str, ...]
+
+
+CATALOGUE: List[CatalogueTip] = [
+    # Passion
+    CatalogueTip(
+        "Volunteer to design slides, diagrams or visuals for your team's next presentation",
+        ("passion",), ("drawing", "painting", "art", "design", "photography", "visual", "craft", "diy"),
+    ),
+    CatalogueTip(
+        "Start or join a writing channel at work: internal blog posts, release notes or newsletters",
+        ("passion",), ("writing", "stories", "poetry", "blog", "reading", "books"),
+    ),
+    CatalogueTip(
+        "Suggest a walking meeting or an outdoor team day to bring your love of nature into work",
+        ("passion",), ("hiking", "nature", "gardening", "outdoors", "exploring", "walking", "sports"),
+    ),
+    CatalogueTip(
+        "Offer to run a short session teaching colleagues something you enjoy",
+        ("passion", "vocation"), ("teaching", "tutoring", "mentoring", "coaching", "others"),
+    ),
+    CatalogueTip(
+        "Take on the gnarly bugs and puzzles others avoid; they are where you do your best work",
+        ("passion",), ("puzzles", "solving", "games", "chess", "logic"),
+    ),
+    CatalogueTip(
+        "Propose a team lunch or potluck where you bring a new recipe",
+        ("passion",), ("cooking", "recipes", "baking", "food"),
+    ),
+    CatalogueTip(
+        "Protect a few minutes a day for focus or mindfulness and invite colleagues to join",
+        ("passion",), ("meditation", "yoga", "mindfulness", "wellbeing"),
+    ),
+    CatalogueTip(
+        "Ask about international projects or colleagues you could pair with to use your languages",
+        ("passion", "profession"), ("languages", "language", "translation", "travel"),
+    ),
+    # Profession
+    CatalogueTip(
+        "Volunteer to present your team's work at demos, all-hands or meetups",
+        ("profession",), ("public", "speaking", "presenting", "communication"),
+    ),
+    CatalogueTip(
+        "Ask to lead a small initiative so you can practise leadership with real stakes",
+        ("profession",), ("leadership", "leading", "managing", "management"),
+    ),
+    CatalogueTip(
+        "Offer to own planning and follow-up for a cross-team project",
+        ("profession", "vocation"), ("project", "planning", "organization", "organizing", "coordination"),
+    ),
+    CatalogueTip(
+        "Bring data to the next team decision: a quick analysis often settles long debates",
+        ("profession", "vocation"), ("analytical", "analysis", "research", "data", "critical"),
+    ),
+    CatalogueTip(
+        "Become the go-to reviewer for work where attention to detail matters most",
+        ("profession",), ("detail", "details", "accuracy", "quality"),
+    ),
+    CatalogueTip(
+        "Pair with people outside your team; your collaboration skills multiply their impact",
+        ("profession",), ("teamwork", "collaboration", "team", "adaptability"),
+    ),
+    CatalogueTip(
+        "Pitch one experimental idea a month to your manager or team",
+        ("profession",), ("creative", "creativity", "ideas", "innovation", "thinking"),
+    ),
+    CatalogueTip(
+        "Look for automation or tooling gaps your technical skills could close",
+        ("profession", "vocation"), ("technical", "software", "programming", "coding", "development", "engineering"),
+    ),
+    # Mission
+    CatalogueTip(
+        "Look for or start a sustainability initiative in your workplace",
+        ("mission",), ("environmental", "environment", "conservation", "sustainable", "sustainability", "climate"),
+    ),
+    CatalogueTip(
+        "Use volunteering days to support education or mentoring programmes",
+        ("mission",), ("education", "access", "literacy", "child", "children", "development"),
+    ),
+    CatalogueTip(
+        "Champion mental health and wellbeing practices on your team",
+        ("mission",), ("mental", "health", "healthcare", "wellness", "wellbeing"),
+    ),
+    CatalogueTip(
+        "Find the community or charity partners your organisation already supports and get involved",
+        ("mission",), ("community", "poverty", "food", "security", "disaster", "relief", "justice", "social", "elderly"),
+    ),
+    CatalogueTip(
+        "Organise a team volunteering day with a local animal shelter",
+        ("mission",), ("animal", "animals", "welfare", "pets"),
+    ),
+    CatalogueTip(
+        "Support arts and culture through your organisation's sponsorship or matching programmes",
+        ("mission",), ("arts", "culture", "preservation", "heritage", "museum"),
+    ),
+    # Vocation
+    CatalogueTip(
+        "Turn what you explain most often into a guide or short course others can reuse",
+        ("vocation",), ("content", "creation", "writing", "technical", "documentation"),
+    ),
+    CatalogueTip(
+        "Offer internal consulting: short office hours where other teams bring you problems",
+        ("vocation",), ("consulting", "advisory", "services", "strategy"),
+    ),
+    CatalogueTip(
+        "Help colleagues plan their growth; informal career coaching builds trust and your network",
+        ("vocation",), ("career", "coaching", "wellness", "health"),
+    ),
+    CatalogueTip(
+        "Volunteer to organise the next offsite, hackathon or team event",
+        ("vocation",), ("event", "events", "planning"),
+    ),
+    CatalogueTip(
+        "Partner with marketing or sales to see how your work reaches customers",
+        ("vocation",), ("marketing", "sales", "branding", "financial", "finance"),
+    ),
+]
+
+# Used for a pillar when none of its keywords appear in the chart
+DEFAULT_TIPS = {
+    "passion": "Set aside time each week to engage in activities you're passionate about",
+    "profession": "Look for opportunities to apply your strongest skills in new contexts",
+    "mission": "Connect your daily work to its broader impact on others",
+    "vocation": "Identify ways to monetize skills you enjoy using",
+}
+
+GAP_TIPS = {
+    "ikigai": "Your Ikigai center is empty. Try to find activities that combine all four pillars.",
+    "love": "Consider how your passions can address needs in the world.",
+    "good": "Look for ways to develop skills in areas you're passionate about.",
+    "paid": "Explore how your skills can be applied to address market demands.",
+    "needs": "Consider how addressing world needs can be turned into sustainable work.",
+}
+
+CLOSING_TIP = ("Share your ikigai insights with your team to foster better collaboration", "teamwork")
+
+_WORD = re.compile(r"[a-z]+")
+_SUFFIXES = ("ing", "ers", "er", "ed", "es", "s")
+
+
+def stem(word: str) -> str:
+    """Crude suffix stripping so "painting", "paints" and "paint" meet."""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def build_index(catalogue: List[CatalogueTip]) -> Dict[Tuple[str, str], List[int]]:
+    index: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+    for number, entry in enumerate(catalogue):
+        for pillar in entry.pillars:
+            for stemmed in {stem(keyword) for keyword in entry.keywords}:
+                index[(pillar, stemmed)].append(number)
+    return dict(index)
+
+
+INDEX = build_index(CATALOGUE)
+
+
+def section_items(chart_data: Dict[str, Any], section: str) -> List[str]:
+    value = chart_data.get(section) or []
+    if isinstance(value, str):
+        return [value]
+    return [str(item) for item in value]
+
+
+def content_hash(chart_data: Dict[str, Any]) -> str:
+    canonical = json.dumps(chart_data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def compute_tips(chart_data: Dict[str, Any]) -> List[Dict[str, str]]:
+    tips = []
+    used = set()
+    for pillar in PILLARS:
+        hits: Dict[int, int] = defaultdict(int)
+        for item in section_items(chart_data, pillar):
+            for word in _WORD.findall(item.lower()):
+                for number in INDEX.get((pillar, stem(word)), ()):
+                    hits[number] += 1
+
+        candidates = [n for n in hits if n not in used]
+        if candidates:
+            # Most keyword hits wins; catalogue order breaks ties
+            best = min(candidates, key=lambda n: (-hits[n], n))
+            used.add(best)
+            tips.append({"tip": CATALOGUE[best].tip, "category": pillar})
+        else:
+            tips.append({"tip": DEFAULT_TIPS[pillar], "category": pillar})
+
+    gaps = [s for s in INTERSECTIONS if s in chart_data and not section_items(chart_data, s)]
+    for section in gaps[:MAX_GAP_TIPS]:
+        tips.append({"tip": GAP_TIPS[section], "category": section})
+
+    tip, category = CLOSING_TIP
+    tips.append({"tip": tip, "category": category})
+    return tips
+
+
+class TipsEngine:
+    def __init__(self, cache_size: int = 1024):
+        self._cache = MemoryCache(cache_size)
+
+    async def tips_for(self, chart_data: Dict[str, Any]) -> List[Dict[str, str]]:
+        key = content_hash(chart_data)
+        tips = await self._cache.get(key)
+        if tips is MISSING:
+            tips = compute_tips(chart_data)
+            # Content-addressed, so entries never go stale and need no TTL
+            await self._cache.set(key, tips)
+        return tips
+
+
+# Dependency used by the charts router
+def get_tips_engine(request: Request) -> TipsEngine:
+    return request.app.state.tips_engine
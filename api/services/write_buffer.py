@@ -0,0 +1,200 @@
+"""Write-behind buffer for autosaved responses.
+
+While users type, the frontend saves the same answer many times a minute.
+With write-behind enabled, ``create_response`` stores the latest value per
+(user_id, question_id) here and returns immediately. A background task
+flushes the buffer as one bulk upsert whenever it reaches ``max_entries`` or
+``flush_interval`` seconds have passed, and whatever is left is flushed on
+shutdown.
+
+Only failures that mean the database is unreachable put entries back for
+the next flush. A chunk the database rejects (a foreign key, uuid or check
+violation) is split in halves until the offending rows are found; those are
+logged and dropped so they cannot hold up everyone else's answers. Once
+``max_pending`` entries are waiting, ``full`` is set and saves are written
+directly instead of growing the buffer.
+
+Entries being flushed stay visible to ``overlay`` and ``discard`` until the
+upsert and the cache invalidation after it have finished, so reads never
+miss an answer mid-flush and a direct write or delete can still stop a stale
+value from being written.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from services.database import Database, is_unavailable
+from services.resilience import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, str]
+
+FLUSH_CHUNK_SIZE = 500
+
+
+def _retryable(exc: BaseException) -> bool:
+    """Whether a failed upsert may succeed unchanged later (database down or busy)."""
+    if isinstance(exc, UpstreamUnavailable) or is_unavailable(exc):
+        return True
+    return isinstance(exc, HTTPException) and exc.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+class ResponseWriteBuffer:
+    def __init__(
+        self,
+        db: Database,
+        max_entries: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 5000,
+    ):
+        self.db = db
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.rejected = 0
+        self._pending: Dict[Key, Dict[str, Any]] = {}
+        self._flushing: Dict[Key, Dict[str, Any]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def full(self) -> bool:
+        """New saves should bypass the buffer (e.g. while the database is down)."""
+        return len(self._pending) >= self.max_pending
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def put(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Buffer a response, replacing any unflushed value for the same question."""
+        key = (row["user_id"], row["question_id"])
+        self._pending.pop(key, None)  # re-insert so dict order follows recency
+        self._pending[key] = dict(row)
+        if len(self._pending) >= self.max_entries:
+            self._wake.set()
+        return {"id": None, **row}
+
+    def holds(self, user_id: str) -> bool:
+        """Whether any of ``user_id``'s answers are buffered or being flushed."""
+        return any(key[0] == user_id for entries in (self._flushing, self._pending) for key in entries)
+
+    def discard(self, keys: Iterable[Key]) -> None:
+        """Drop buffered values that a direct write has just superseded."""
+        for key in keys:
+            self._pending.pop(key, None)
+            self._flushing.pop(key, None)
+
+    def overlay(
+        self,
+        user_id: str,
+        rows: List[Dict[str, Any]],
+        pillar: Optional[str] = None,
+        include_new: bool = True,
+    ) -> List[Dict[str, Any]]:
+        """Apply this user's unflushed values on top of rows read from the database.
+
+        Buffered answers with no stored row yet are appended unless
+        ``include_new`` is False. Paged listings pass False and flush first
+        instead, since appended rows would break the page size and cursor.
+        """
+        # Values still in flight first, so newer unflushed ones replace them
+        buffered = {
+            question_id: row
+            for entries in (self._flushing, self._pending)
+            for (row_user_id, question_id), row in entries.items()
+            if row_user_id == user_id and (pillar is None or row["pillar"] == pillar)
+        }
+        if not buffered:
+            return rows
+
+        merged = []
+        for row in rows:
+            pending = buffered.pop(row["question_id"], None)
+            merged.append({**row, **pending} if pending else row)
+        if include_new:
+            merged.extend({"id": None, **row} for row in buffered.values())
+        return merged
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            batch = self._flushing = self._pending
+            self._pending = {}
+            keys = list(batch)
+            written = set()
+            try:
+                for start in range(0, len(keys), FLUSH_CHUNK_SIZE):
+                    await self._upsert(batch, keys[start:start + FLUSH_CHUNK_SIZE], written)
+            except (Exception, asyncio.CancelledError) as e:
+                # Put unwritten entries back unless a newer value arrived or
+                # they were discarded or rejected
+                for key, row in batch.items():
+                    if key not in written:
+                        self._pending.setdefault(key, row)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                logger.warning("Database unavailable, %d buffered responses kept for the next flush: %s",
+                               len(batch) - len(written), e)
+                return len(written)
+            finally:
+                if written:
+                    await self.db.invalidate(*{f"responses:{user_id}" for user_id, _ in written})
+                self._flushing = {}
+            return len(written)
+
+    async def _upsert(self, batch: Dict[Key, Dict[str, Any]], keys: List[Key], written: set) -> None:
+        # Skip entries discarded while earlier chunks were written
+        keys = [key for key in keys if key in batch]
+        if not keys:
+            return
+        try:
+            await self.db.execute(self.db.table("responses").upsert(
+                [batch[key] for key in keys],
+                on_conflict="user_id,question_id"
+            ))
+        except Exception as e:
+            if _retryable(e):
+                raise
+            # One bad row fails the whole statement; bisect to find it
+            if len(keys) == 1:
+                logger.warning("Dropping buffered response %s rejected by the database: %s", keys[0], e)
+                batch.pop(keys[0], None)
+                self.rejected += 1
+                return
+            middle = len(keys) // 2
+            await self._upsert(batch, keys[:middle], written)
+            await self._upsert(batch, keys[middle:], written)
+            return
+        written.update(keys)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+
+# Dependency used by the responses router; None when write-behind is disabled
+def get_response_buffer(request: Request) -> Optional[ResponseWriteBuffer]:
+    return getattr(request.app.state, "response_buffer", None)
@@ -0,0 +1,13 @@
+-- Indexes for the keyset-paged bulk export (GET /admin/export, python -m bulk),
+-- which walks each table in (created_at, id) order.
+-- Run this once in the Supabase SQL Editor on databases created from
+-- supabase_setup.sql before the indexes were part of it.
+
+CREATE INDEX IF NOT EXISTS profiles_created_at_id_idx
+  ON public.profiles (created_at, id);
+
+CREATE INDEX IF NOT EXISTS responses_created_at_id_idx
+  ON public.responses (created_at, id);
+
+CREATE INDEX IF NOT EXISTS charts_created_at_id_idx
+  ON public.charts (created_at, id);
@@ -0,0 +1,27 @@
+-- updated_at column and trigger on responses, used by GET /responses/?since=
+-- Run this once in the Supabase SQL Editor on databases created from
+-- supabase_setup.sql before the column was part of it.
+
+ALTER TABLE public.responses
+  ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT now();
+
+UPDATE public.responses SET updated_at = created_at WHERE updated_at IS NULL;
+
+CREATE OR REPLACE FUNCTION public.update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = now();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Also fires for the API's upserts (ON CONFLICT DO UPDATE)
+DROP TRIGGER IF EXISTS update_responses_updated_at ON public.responses;
+CREATE TRIGGER update_responses_updated_at
+  BEFORE UPDATE ON public.responses
+  FOR EACH ROW
+  EXECUTE FUNCTION public.update_updated_at_column();
+
+-- Delta reads filter on (user_id, updated_at)
+CREATE INDEX IF NOT EXISTS responses_user_id_updated_at_idx
+  ON public.responses (user_id, updated_at);
@@ -0,0 +1,34 @@
+-- Unique keys required by the API's single-statement upserts
+-- (POST /responses/ upserts on (user_id, question_id), POST /charts/ on user_id).
+-- Run this once in the Supabase SQL Editor on databases created before the
+-- constraints were part of supabase_setup.sql.
+
+-- Keep only the most recent response per (user_id, question_id)
+DELETE FROM public.responses r
+USING public.responses newer
+WHERE r.user_id = newer.user_id
+  AND r.question_id = newer.question_id
+  AND (r.created_at, r.id) < (newer.created_at, newer.id);
+
+-- Keep only the most recent chart per user
+DELETE FROM public.charts c
+USING public.charts newer
+WHERE c.user_id = newer.user_id
+  AND (c.created_at, c.id) < (newer.created_at, newer.id);
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_constraint WHERE conname = 'responses_user_id_question_id_key'
+  ) THEN
+    ALTER TABLE public.responses
+      ADD CONSTRAINT responses_user_id_question_id_key UNIQUE (user_id, question_id);
+  END IF;
+
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_constraint WHERE conname = 'charts_user_id_key'
+  ) THEN
+    ALTER TABLE public.charts
+      ADD CONSTRAINT charts_user_id_key UNIQUE (user_id);
+  END IF;
+END $$;
@@ -0,0 +1,15 @@
+-- Server-side chart materialisation
+-- The API rebuilds only the chart sections affected by a changed answer and
+-- merges them into charts.chart_data with this function, so a change never
+-- rewrites the whole chart. Run this once in the Supabase SQL Editor.
+
+CREATE OR REPLACE FUNCTION public.merge_chart_sections(p_user_id UUID, p_sections JSONB)
+RETURNS SETOF public.charts
+LANGUAGE sql
+AS $$
+    INSERT INTO public.charts (user_id, chart_data)
+    VALUES (p_user_id, p_sections)
+    ON CONFLICT (user_id)
+    DO UPDATE SET chart_data = public.charts.chart_data || EXCLUDED.chart_data
+    RETURNING *;
+$$;
@@ -9,6 +9,10 @@ CREATE TABLE IF NOT EXISTS public.profiles (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
 );
 
+-- Bulk export (GET /admin/export) pages through every table in (created_at, id) order
+CREATE INDEX IF NOT EXISTS profiles_created_at_id_idx
+    ON public.profiles (created_at, id);
+
 -- Set up Row Level Security for profiles
 ALTER TABLE public.profiles ENABLE ROW LEVEL SECURITY;
 
@@ -35,9 +39,33 @@ CREATE TABLE IF NOT EXISTS public.responses (
     pillar TEXT NOT NULL,
     question_id TEXT NOT NULL,
     response TEXT NOT NULL,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    -- One answer per question; the API upserts on this key
+    UNIQUE(user_id, question_id)
 );
 
+-- Keep updated_at current on every update, including upserts
+CREATE OR REPLACE FUNCTION public.update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = now();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER update_responses_updated_at
+    BEFORE UPDATE ON public.responses
+    FOR EACH ROW
+    EXECUTE FUNCTION public.update_updated_at_column();
+
+-- Delta reads (GET /responses/?since=) filter on (user_id, updated_at)
+CREATE INDEX IF NOT EXISTS responses_user_id_updated_at_idx
+    ON public.responses (user_id, updated_at);
+
+CREATE INDEX IF NOT EXISTS responses_created_at_id_idx
+    ON public.responses (created_at, id);
+
 -- Set up Row Level Security for responses
 ALTER TABLE public.responses ENABLE ROW LEVEL SECURITY;
 
@@ -55,11 +83,15 @@ CREATE POLICY "Users can insert their own responses"
 -- Create charts table
 CREATE TABLE IF NOT EXISTS public.charts (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    user_id UUID REFERENCES public.profiles(id) ON DELETE CASCADE,
+    -- One chart per user; the API upserts on this key
+    user_id UUID UNIQUE REFERENCES public.profiles(id) ON DELETE CASCADE,
     chart_data JSONB NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT now()
 );
 
+CREATE INDEX IF NOT EXISTS charts_created_at_id_idx
+    ON public.charts (created_at, id);
+
 -- Set up Row Level Security for charts
 ALTER TABLE public.charts ENABLE ROW LEVEL SECURITY;
 
@@ -74,6 +106,19 @@ CREATE POLICY "Users can insert their own charts"
     FOR INSERT 
     WITH CHECK (auth.uid() = user_id);
 
+-- Merge recomputed sections into a user's chart; the API calls this whenever
+-- an answer changes (see supabase/chart_materialization.sql)
+CREATE OR REPLACE FUNCTION public.merge_chart_sections(p_user_id UUID, p_sections JSONB)
+RETURNS SETOF public.charts
+LANGUAGE sql
+AS $$
+    INSERT INTO public.charts (user_id, chart_data)
+    VALUES (p_user_id, p_sections)
+    ON CONFLICT (user_id)
+    DO UPDATE SET chart_data = public.charts.chart_data || EXCLUDED.chart_data
+    RETURNING *;
+$$;
+
 -- Create a function to handle user creation
 CREATE OR REPLACE FUNCTION public.handle_new_user() 
 RETURNS TRIGGER AS $$